@@ -0,0 +1,214 @@
+"""Async (ASGI) serving mode for the KNBS dashboard API
+
+Same routes and responses as api_final.py, but every /logs stream, status and
+data request is served on one event loop: a stream is a suspended task rather
+than a thread blocked on the log hub, so hundreds of dashboard viewers cost
+hundreds of coroutines.
+
+    hypercorn api_async:app --bind 0.0.0.0:5000     # or: python api_async.py
+
+The scraper is a managed background task: the server's loop owns it (status,
+one run at a time, cancellation at shutdown), but it executes on one worker
+thread with its own loop, because its SQLite frontier and page cache, the
+knbs_files.json rewrite and the shard pool shutdown are blocking calls that
+would otherwise stall every stream. Serialization, compression and index
+builds run in the default thread pool for the same reason.
+"""
+import asyncio
+import json
+import os
+import threading
+from contextlib import suppress
+from datetime import datetime
+
+from quart import Quart, jsonify, render_template, Response, request
+
+from kenya_final import js_interaction
+from api_final import (
+    DATA_FILE, LOG_HEARTBEAT_SECONDS, SSE_HEADERS, cached_payload, conditional_response, data_query,
+    log_hub, log_message, log_stream_chunk, refresh_data, report_store, search_payload,
+)
+
+app = Quart(__name__)
+
+scrape_task = None  # the running scraper, if any
+scraper_thread = None
+
+
+class ScraperThread:
+    """Runs js_interaction() on the calling worker thread's own event loop; cancel() may be called from any thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._task = None
+        self._cancelled = False
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            with self._lock:
+                if self._cancelled:
+                    raise asyncio.CancelledError()
+                self._loop = loop
+                self._task = loop.create_task(js_interaction())
+            loop.run_until_complete(self._task)
+        finally:
+            with self._lock:
+                self._loop = None
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+
+
+def scraping_active():
+    return scrape_task is not None and not scrape_task.done()
+
+
+async def run_scraper(scraper):
+    """Run the scraper on its worker thread, then refresh the data it wrote"""
+    log_message("Scraper is now running...", "info")
+    try:
+        await asyncio.to_thread(scraper.run)
+        log_message("Scraping completed successfully!", "success")
+        log_message("Data has been saved to knbs_files.json", "info")
+        await asyncio.to_thread(refresh_data)
+    except asyncio.CancelledError:
+        log_message("Scraper cancelled", "warning")
+        raise
+    except Exception as e:
+        log_message(f"Scraping failed: {str(e)}", "error")
+    finally:
+        log_message("Scraper process ended.", "info")
+
+
+async def json_response(key, build):
+    """Send a cached payload, building and compressing it off the event loop"""
+    entry = await asyncio.to_thread(cached_payload, key, build)
+    status, body, headers = conditional_response(entry, request)
+    if status == 304:
+        return Response(b"", status=304, headers=headers)
+    return Response(body, status=status, mimetype="application/json", headers=headers)
+
+
+@app.after_serving
+async def stop_scraper():
+    """Cancel a scrape still running at shutdown, so the browser is closed cleanly"""
+    if scraping_active():
+        scraper_thread.cancel()  # the scraper's own loop cancels it; this loop just waits for the thread
+        with suppress(asyncio.CancelledError):
+            await scrape_task
+
+
+@app.route('/')
+async def index():
+    return await render_template('index.html')
+
+
+@app.route('/run-crawl', methods=['GET'])
+async def run_crawl():
+    """
+    API endpoint to trigger the web crawling script.
+    """
+    global scrape_task, scraper_thread
+    if scraping_active():
+        return jsonify({"error": "Scraper is already running. Please wait for it to complete."}), 409
+    # Clear previous logs (viewers that are already connected keep what they have)
+    log_hub.clear()
+    log_message("Scraper request received", "info")
+    scraper_thread = ScraperThread()
+    scrape_task = asyncio.create_task(run_scraper(scraper_thread))
+    return jsonify({"message": "Web crawling script has been started in the background."}), 202
+
+
+@app.route('/get-data', methods=['GET'])
+async def get_data():
+    """
+    API endpoint to retrieve the latest crawled data (see api_final.get_data).
+    """
+    if not os.path.exists(DATA_FILE):
+        log_message("Data file not found", "warning")
+        return jsonify({"error": "Data file not found. Please run the script first."}), 404
+    try:
+        try:
+            query = data_query(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if query is None:
+            records = await asyncio.to_thread(lambda: report_store.records)  # first use loads the file
+            log_message(f"Data retrieved successfully: {len(records)} records", "success")
+            return await json_response("all", lambda: report_store.records)
+        return await json_response(json.dumps(query, sort_keys=True), lambda: report_store.query(**query))
+    except Exception as e:
+        log_message(f"Error reading data file: {str(e)}", "error")
+        return jsonify({"error": f"Error reading data file: {str(e)}"}), 500
+
+
+@app.route('/get-data/facets', methods=['GET'])
+async def get_facets():
+    """
+    Totals and filter values of the whole dataset (see api_final.get_facets).
+    """
+    if not os.path.exists(DATA_FILE):
+        return jsonify({"error": "Data file not found. Please run the script first."}), 404
+    try:
+        return await json_response("facets", lambda: report_store.facets)
+    except Exception as e:
+        log_message(f"Error reading data file: {str(e)}", "error")
+        return jsonify({"error": f"Error reading data file: {str(e)}"}), 500
+
+
+@app.route('/search', methods=['GET'])
+async def search():
+    """
+    Full-text search over the reports (see api_final.search).
+    """
+    try:
+        key, build = search_payload(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not os.path.exists(DATA_FILE):
+        return jsonify({"error": "Data file not found. Please run the script first."}), 404
+    try:
+        return await json_response(key, build)
+    except Exception as e:
+        log_message(f"Search failed: {str(e)}", "error")
+        return jsonify({"error": f"Search failed: {str(e)}"}), 500
+
+
+@app.route('/logs')
+async def stream_logs():
+    """
+    Server-Sent Events endpoint for streaming logs in real-time, resumable with Last-Event-ID
+    """
+    cursor = log_hub.cursor(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+
+    async def generate():
+        nonlocal cursor
+        yield f"data: {json.dumps({'timestamp': datetime.now().strftime('%H:%M:%S'), 'message': 'Connected to log stream', 'level': 'info'})}\n\n".encode()
+        while True:
+            events, skipped = await log_hub.wait_async(cursor, timeout=LOG_HEARTBEAT_SECONDS)
+            yield log_stream_chunk(events, skipped).encode()
+            if events:
+                cursor = events[-1][0]
+
+    response = Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+    response.timeout = None  # streams stay open; don't apply the response timeout
+    return response
+
+
+@app.route('/scraper-status')
+async def scraper_status():
+    """
+    Get current scraper status
+    """
+    return jsonify({"active": scraping_active()})
+
+
+if __name__ == '__main__':
+    app.run()
@@ -1,35 +1,71 @@
-from flask import Flask, jsonify, render_template, Response
+from flask import Flask, jsonify, render_template, Response, request
 import asyncio
 import threading
 import json
 import os
 import time
-import queue
+import gzip
+import hashlib
+from collections import OrderedDict
 from datetime import datetime
+from email.utils import formatdate
 from kenya_final import js_interaction # This is the key line
+from report_store import ReportStore
+from search_index import SearchIndex, MAX_LIMIT
+from log_hub import LogHub
+
+try:
+    import brotli  # optional: smaller /get-data responses for browsers that accept br
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 
-# Global queue for log messages
-log_queue = queue.Queue()
+# Log messages, broadcast to every /logs viewer
+log_hub = LogHub()
+LOG_HEARTBEAT_SECONDS = 10
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'Access-Control-Allow-Origin': '*'
+}
 scraping_active = False
 scraping_lock = threading.Lock()
 
+DATA_FILE = 'knbs_files.json'
+# /get-data query parameters; a request with none of them gets the full legacy array
+QUERY_PARAMS = ("page", "page_size", "category", "year", "month", "has_files", "q")
+report_store = ReportStore(DATA_FILE)  # loaded on first use, refreshed when a scrape finishes
+search_index = SearchIndex('knbs_search.sqlite')  # FTS5 index for /search, rebuilt when the data changes
+
+# Serialized /get-data payloads, keyed by (data version, query); cleared when the data changes
+PAYLOAD_CACHE_SIZE = 64
+COMPRESS_MIN_BYTES = 1024
+payload_cache = OrderedDict()
+payload_cache_lock = threading.Lock()
+
 def log_message(message, level="info"):
-    """Add a log message to the queue with timestamp"""
+    """Publish a log message with timestamp to every log viewer"""
     timestamp = datetime.now().strftime("%H:%M:%S")
     log_entry = {
         "timestamp": timestamp,
         "message": message,
         "level": level
     }
-    log_queue.put(log_entry)
+    log_hub.publish(log_entry)
 
 # Route to serve the HTML file
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def refresh_data():
+    """Reload the data store and search index after a scrape wrote new data"""
+    if os.path.exists(DATA_FILE) and report_store.refresh():
+        log_message("Data store refreshed", "info")
+        if search_index.ensure(report_store.records, report_store.version):
+            log_message("Search index rebuilt", "info")
+
 def run_in_new_loop(loop, coro):
     """
     Function to run an asyncio coroutine in a separate thread's event loop.
@@ -51,6 +87,7 @@ def run_in_new_loop(loop, coro):
         
         log_message("Scraping completed successfully!", "success")
         log_message("Data has been saved to knbs_files.json", "info")
+        refresh_data()
         
     except Exception as e:
         log_message(f"Scraping failed: {str(e)}", "error")
@@ -71,9 +108,8 @@ def run_crawl():
             return jsonify({"error": "Scraper is already running. Please wait for it to complete."}), 409
     
     try:
-        # Clear previous logs
-        while not log_queue.empty():
-            log_queue.get()
+        # Clear previous logs (viewers that are already connected keep what they have)
+        log_hub.clear()
             
         log_message("Scraper request received", "info")
         
@@ -87,18 +123,161 @@ def run_crawl():
         log_message(f"Failed to start scraper: {str(e)}", "error")
         return jsonify({"error": str(e)}), 500
 
+def cached_payload(key, build):
+    """Serialized JSON for key (built once per data version), with its ETag and compressed copies"""
+    try:
+        # One os.stat per request, so a knbs_files.json rewritten by the CLI or run_all is picked up too
+        if report_store.refresh():
+            log_message("Data file changed on disk, data store refreshed", "info")
+    except (OSError, ValueError) as e:
+        log_message(f"Could not reload {DATA_FILE}, serving the loaded data: {e}", "warning")
+    snapshot = report_store.snapshot
+    version = snapshot["version"]
+    cache_key = (version, key)
+    with payload_cache_lock:
+        entry = payload_cache.get(cache_key)
+        if entry is not None:
+            payload_cache.move_to_end(cache_key)
+            return entry
+    body = json.dumps(build(), ensure_ascii=False).encode("utf-8")
+    entry = {
+        "body": body,
+        "etag": f'"{version[:16]}-{hashlib.sha1(body).hexdigest()[:16]}"',
+        "version": version,
+        "mtime": snapshot["mtime"],
+        "last_modified": formatdate(snapshot["mtime"], usegmt=True),
+    }
+    if len(body) >= COMPRESS_MIN_BYTES:
+        entry["gzip"] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            entry["br"] = brotli.compress(body, quality=5)
+    if report_store.version != version:
+        return entry  # data changed while building: serve it, but don't cache it under the old version
+    with payload_cache_lock:
+        if payload_cache and next(iter(payload_cache))[0] != version:
+            payload_cache.clear()  # entries of an older version can never be hit again
+        payload_cache[cache_key] = entry
+        while len(payload_cache) > PAYLOAD_CACHE_SIZE:
+            payload_cache.popitem(last=False)
+    return entry
+
+
+def conditional_response(entry, req):
+    """Status, body and headers for a cached payload: 304 when the client's copy is current, compressed when it accepts it"""
+    headers = {
+        "ETag": entry["etag"],
+        "Last-Modified": entry["last_modified"],
+        "Cache-Control": "no-cache",  # always revalidate; unchanged data costs a 304
+        "Vary": "Accept-Encoding",
+        "X-Data-Version": entry["version"],  # lets the dashboard tell whether /search positions match its copy
+    }
+    if req.if_none_match:
+        if req.if_none_match.contains_weak(entry["etag"].strip('"')):
+            return 304, b"", headers
+    elif req.if_modified_since:
+        if int(entry["mtime"]) <= req.if_modified_since.timestamp():
+            return 304, b"", headers
+
+    body = entry["body"]
+    for encoding in ("br", "gzip"):
+        if encoding in entry and req.accept_encodings[encoding]:
+            body = entry[encoding]
+            headers["Content-Encoding"] = encoding
+            break
+    return 200, body, headers
+
+
+def json_response(key, build):
+    """Send a cached payload, honouring the request's conditional and encoding headers"""
+    status, body, headers = conditional_response(cached_payload(key, build), request)
+    if status == 304:
+        return Response(status=304, headers=headers)
+    return Response(body, status=status, mimetype="application/json", headers=headers)
+
+
+def data_query(args):
+    """The /get-data query in args, or None for the full legacy array (ValueError on bad paging)"""
+    if not any(param in args for param in QUERY_PARAMS):
+        return None
+    try:
+        page = int(args.get("page", 1))
+        page_size = int(args.get("page_size", 50))
+    except ValueError:
+        raise ValueError("page and page_size must be integers")
+    return {
+        "page": page,
+        "page_size": page_size,
+        "category": args.get("category"),
+        "year": args.get("year"),
+        "month": args.get("month"),
+        "has_files": args.get("has_files", "").lower() in ("1", "true", "yes"),
+        "q": args.get("q"),
+    }
+
+
+def search_payload(args):
+    """Cache key and payload builder for a /search request (ValueError on a bad one)"""
+    q = args.get("q", "").strip()
+    if not q:
+        raise ValueError("q is required")
+    try:
+        limit = int(args.get("limit", 20))
+        offset = int(args.get("offset", 0))
+    except ValueError:
+        raise ValueError("limit and offset must be integers")
+    positions_only = args.get("positions", "").lower() in ("1", "true", "yes")
+
+    def build():
+        version = report_store.version
+        search_index.ensure(report_store.records, version)  # no-op unless the data changed
+        if positions_only:
+            positions = search_index.positions(q)
+            # Positions index the data of this version; a client holding another version can't use them
+            return {"query": q, "total": len(positions), "positions": positions, "version": version}
+        found = search_index.search(q, limit=min(limit, MAX_LIMIT), offset=offset)
+        records = report_store.records
+        return {
+            "query": q,
+            "total": found["total"],
+            "results": [
+                {"score": hit["score"], "snippet": hit["snippet"], "record": records[hit["position"]]}
+                for hit in found["results"]
+            ],
+        }
+
+    return json.dumps(["search", q, positions_only, limit, offset]), build
+
+
+def log_stream_chunk(events, skipped):
+    """SSE text for one read from the log hub: the events with their ids, or a heartbeat"""
+    chunk = ""
+    if skipped:
+        # Too slow to keep up: one notice instead of the missed messages
+        chunk += f"data: {json.dumps({'timestamp': datetime.now().strftime('%H:%M:%S'), 'message': f'{skipped} log messages skipped', 'level': 'warning'})}\n\n"
+    if not events:
+        # Send heartbeat to keep connection alive
+        return chunk + f"data: {json.dumps({'heartbeat': True})}\n\n"
+    return chunk + "".join(f"id: {log_hub.event_id(event_id)}\ndata: {json.dumps(log_entry)}\n\n" for event_id, log_entry in events)
+
+
 @app.route('/get-data', methods=['GET'])
 def get_data():
     """
     API endpoint to retrieve the latest crawled data from the knbs_files.json file.
+
+    With any of page, page_size, category, year, month, has_files or q it returns
+    one filtered page: {"data": [...], "page", "page_size", "total", "pages"}.
     """
-    file_path = 'knbs_files.json'
-    if os.path.exists(file_path):
+    if os.path.exists(DATA_FILE):
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            log_message(f"Data retrieved successfully: {len(data)} records", "success")
-            return jsonify(data), 200
+            try:
+                query = data_query(request.args)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if query is None:
+                log_message(f"Data retrieved successfully: {len(report_store.records)} records", "success")
+                return json_response("all", lambda: report_store.records)
+            return json_response(json.dumps(query, sort_keys=True), lambda: report_store.query(**query))
         except Exception as e:
             log_message(f"Error reading data file: {str(e)}", "error")
             return jsonify({"error": f"Error reading data file: {str(e)}"}), 500
@@ -106,32 +285,70 @@ def get_data():
         log_message("Data file not found", "warning")
         return jsonify({"error": "Data file not found. Please run the script first."}), 404
 
+@app.route('/get-data/facets', methods=['GET'])
+def get_facets():
+    """
+    Totals and filter values of the whole dataset: {"total", "files", "categories", "years", "months"}.
+    The dashboard loads these once and then asks /get-data for one page at a time.
+    """
+    if not os.path.exists(DATA_FILE):
+        return jsonify({"error": "Data file not found. Please run the script first."}), 404
+    try:
+        return json_response("facets", lambda: report_store.facets)
+    except Exception as e:
+        log_message(f"Error reading data file: {str(e)}", "error")
+        return jsonify({"error": f"Error reading data file: {str(e)}"}), 500
+
+@app.route('/search', methods=['GET'])
+def search():
+    """
+    Full-text search over report titles, overviews and categories.
+
+    Every word must match, as a prefix; results come best first:
+    {"query", "total", "results": [{"score", "snippet", "record"}]}. The snippet
+    is HTML-escaped text with the hits wrapped in <mark>.
+    With positions=1 it returns the positions of all matching records in
+    /get-data order instead.
+    """
+    try:
+        key, build = search_payload(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not os.path.exists(DATA_FILE):
+        return jsonify({"error": "Data file not found. Please run the script first."}), 404
+    try:
+        return json_response(key, build)
+    except Exception as e:
+        log_message(f"Search failed: {str(e)}", "error")
+        return jsonify({"error": f"Search failed: {str(e)}"}), 500
+
 @app.route('/logs')
 def stream_logs():
     """
     Server-Sent Events endpoint for streaming logs in real-time
+
+    Every event carries its id, so a reconnecting EventSource (Last-Event-ID
+    header, or ?last_event_id=) resumes where it left off.
     """
+    cursor = log_hub.cursor(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+
     def generate():
+        nonlocal cursor
         # Send initial connection message
         yield f"data: {json.dumps({'timestamp': datetime.now().strftime('%H:%M:%S'), 'message': 'Connected to log stream', 'level': 'info'})}\n\n"
         
         while True:
             try:
-                # Get log message from queue (blocks until available)
-                log_entry = log_queue.get(timeout=10)
-                yield f"data: {json.dumps(log_entry)}\n\n"
-            except queue.Empty:
-                # Send heartbeat to keep connection alive
-                yield f"data: {json.dumps({'heartbeat': True})}\n\n"
+                # Wait for events after this viewer's cursor
+                events, skipped = log_hub.wait(cursor, timeout=LOG_HEARTBEAT_SECONDS)
+                yield log_stream_chunk(events, skipped)
+                if events:
+                    cursor = events[-1][0]
             except Exception as e:
                 yield f"data: {json.dumps({'timestamp': datetime.now().strftime('%H:%M:%S'), 'message': f'Log stream error: {str(e)}', 'level': 'error'})}\n\n"
                 break
     
-    return Response(generate(), mimetype='text/event-stream', headers={
-        'Cache-Control': 'no-cache',
-        'Connection': 'keep-alive',
-        'Access-Control-Allow-Origin': '*'
-    })
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
 
 @app.route('/scraper-status')
 def scraper_status():
@@ -1,14 +1,27 @@
 import asyncio
 import csv
+import hashlib
 import json
+import multiprocessing
+import queue
 import pandas as pd
 from typing import Dict, List
 from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode, CrawlResult
 from crawl4ai import JsonCssExtractionStrategy, BrowserConfig
 import os
-import requests
+import sys
 import urllib3
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for nso_common
+from nso_common.downloader import DownloadPipeline
+from nso_common.frontier import CrawlFrontier
+from nso_common.ndjson import OrderedNdjsonWriter, read_ndjson, write_json_array
+from nso_common.page_cache import PageCache
+from nso_common.static_fetch import StaticFetcher
+from nso_common.throttle import HostThrottle
+from nso_common.url_rules import UrlRules
+from nso_common.urls import ensure_base_url
+
 # Disable only the single InsecureRequestWarning from urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -20,6 +33,214 @@ except ImportError:
     def log_message(message, level="info"):
         print(f"[{level.upper()}] {message}")
 
+# Report-detail crawl settings (override with environment variables)
+REPORT_CONCURRENCY = int(os.environ.get("KNBS_REPORT_CONCURRENCY", "4"))  # browser pages working in parallel
+REPORT_SHARDS = int(os.environ.get("KNBS_REPORT_SHARDS", "1"))  # >1: split the report crawl across this many processes
+POLITENESS_DELAY = float(os.environ.get("KNBS_POLITENESS_DELAY", "1.0"))  # seconds between requests to one host
+FRONTIER_PATH = os.environ.get("KNBS_FRONTIER", "knbs_frontier.sqlite")  # crawl state kept between runs for resuming
+URL_RULES_PATH = os.environ.get("KNBS_URL_RULES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "knbs_url_rules.json"))
+
+# Which listing pages need the "Load More" handling and which are skipped ("load_more" / "skip" / "normal")
+url_rules = UrlRules.load(URL_RULES_PATH)
+
+# "Load More" listing pages
+LOAD_MORE_IDLE_MS = int(os.environ.get("KNBS_LOAD_MORE_IDLE_MS", "15000"))  # give up on a click that adds nothing for this long
+LOAD_MORE_QUIET_MS = 500  # DOM must be quiet this long before the next click
+LOAD_MORE_MAX_CLICKS = int(os.environ.get("KNBS_LOAD_MORE_MAX_CLICKS", "200"))
+LOAD_MORE_MAX_MS = int(os.environ.get("KNBS_LOAD_MORE_MAX_MS", "600000"))  # hard cap for one page
+
+# Numbered listing pages
+PREDICT_PAGINATION = os.environ.get("KNBS_PREDICT_PAGINATION", "1") != "0"  # build /page/N/ URLs from page 1 instead of walking "next"
+PAGINATION_CONCURRENCY = int(os.environ.get("KNBS_PAGINATION_CONCURRENCY", "4"))
+
+
+def extract_schema(schema, url, html):
+    """Run a JSON CSS schema against HTML that has already been fetched"""
+    if not html:
+        return []
+    return JsonCssExtractionStrategy(schema=schema).run(url, [html])
+
+
+def crawl_error(results):
+    """Why a page load failed, or None if at least one result succeeded"""
+    if any(result.success for result in results):
+        return None
+    return next((result.error_message for result in results if result.error_message), "crawl failed")
+
+
+# ---------------- Report page schemas ----------------#
+# Module level, so the report crawl can also run in shard processes (KNBS_REPORT_SHARDS)
+
+pdf_links = {
+    "name": "xlsx_links",
+    "description":"Extract all XLSX titles and links",
+    "baseSelector": ".l-main .l-section.wpb_row.height_large .w-btn-wrapper",
+    "type": "list",
+    "fields": [
+        {
+            "name":"pdf",
+            "selector": "a[href$='.pdf']",
+            "type": "attribute",
+            "attribute": "href",
+            "multiple": True
+        }
+    ]
+}
+xlsx__links = {
+    "name": "xlsx_links",
+    "description":"Extract all XLSX titles and links",
+    "baseSelector": ".l-main .l-section.wpb_row.height_large .wpb_wrapper p",
+    "type": "list",
+    "fields": [
+        {
+            "name":"xlsx",
+            "selector": "a[href$='.xlsx']",
+            "type": "attribute",
+            "attribute": "href",
+            "multiple": True
+        }
+    ]
+}
+more_details = {
+    "name": "more_details",
+    "baseSelector": "body .l-main",
+    "type": "list",
+    "fields": [
+        {"name": "main_report_title","selector": "h1.entry-title","type": "text"},
+        {"name": "main_report_url", "selector":"a.w-btn.us-btn-style_6", "type": "attribute", "attribute": "href"},
+        {"name": "main_category","selector": ".main_category span","type": "text"},
+        {"name": "sub_category","selector": ".sub_category","type": "text"},
+        {"name": "post_month","selector": ".month span","type": "text"},
+        {"name":"post_year","selector": ".year span","type": "text"},
+        {"name": "overview","selector": ".report_short_description p","type": "text"},
+    ]
+}
+
+
+async def crawl_report(crawler, cache, url, session_id):
+    """Render one report page and build its report records"""
+    # 🔥 Reset per report
+    pdf_files = []
+    xlsx_files = []
+    reports = []
+
+    # ---------------- Single page load per report ----------------
+    # The page is rendered once and the pdf/xlsx/details schemas all run on the same HTML.
+
+    config_report = CrawlerRunConfig(
+        cache_mode=CacheMode.BYPASS,
+        scan_full_page=True,
+        wait_for="body main.l-main",
+        extraction_strategy=JsonCssExtractionStrategy(schema=more_details),
+        session_id=session_id,
+        magic=True,
+        js_code="document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
+    )
+    results: List[CrawlResult] = await cache.arun(crawler, url, config_report)
+    error = crawl_error(results)
+    if error is not None:
+        raise RuntimeError(error)  # a failed render is retried, unlike a page without reports
+    for result in results:
+        if not result.success:
+            continue
+
+        # ---------------- PDF extraction ----------------
+        for item in extract_schema(pdf_links, url, result.html):
+            pdf_link = item.get("pdf", [])
+            if pdf_link and pdf_link not in pdf_files:
+                pdf_files.append(pdf_link)
+
+        # ---------------- XLSX extraction ----------------
+        for item in extract_schema(xlsx__links, url, result.html):
+            xlsx_link = item.get("xlsx", [])
+            if xlsx_link and xlsx_link not in xlsx_files:
+                xlsx_files.append(xlsx_link)
+
+        # ---------------- Main Report extraction ----------------
+        items = json.loads(result.extracted_content)
+        for item in items:
+            main_url = item.get("main_report_url", "")
+            # Remove main_report_url from pdf_files if present
+            pdf_files_cleaned = [link for link in pdf_files if link != main_url]
+            report = {
+                "main_report_title": item.get("main_report_title", ""),
+                "main_category": item.get("main_category", ""),
+                "sub_category": item.get("sub_category", ""),
+                "post_month": item.get("post_month", ""),
+                "post_year": item.get("post_year", ""),
+                "overview": item.get("overview", ""),
+                "main_report_url": main_url,
+                "pdf_files": pdf_files_cleaned,
+                "xlsx_files": xlsx_files,
+            }
+            reports.append(report)
+    return reports
+
+
+async def crawl_reports(crawler, cache, urls, throttle, on_report, workers=REPORT_CONCURRENCY):
+    """Crawl report pages on a bounded pool of browser pages; on_report(url, reports, error) is awaited for each"""
+    report_queue: asyncio.Queue = asyncio.Queue()
+    for url in urls:
+        report_queue.put_nowait(url)
+
+    async def report_worker(worker_id):
+        """Pull report URLs off the queue on this worker's own browser page"""
+        session_id = f"knbs_report_{worker_id}"
+        while True:
+            try:
+                url = report_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            await throttle.wait(url)
+            log_message(f"[FETCH]... ↓ {url}", "info")
+            try:
+                reports = await crawl_report(crawler, cache, url, session_id)
+            except Exception as e:
+                log_message(f"[ERROR] Failed to crawl report {url}: {e}", "error")
+                await on_report(url, None, str(e))
+                continue
+            await on_report(url, reports, None)
+        await crawler.crawler_strategy.kill_session(session_id)
+
+    workers = max(1, min(workers, report_queue.qsize()))
+    await asyncio.gather(*(report_worker(worker_id) for worker_id in range(workers)))
+
+
+def shard_of(url, shards):
+    """Stable shard number for a URL (the same in every process and every run)"""
+    return int(hashlib.sha1(url.encode("utf-8")).hexdigest(), 16) % shards
+
+
+async def crawl_report_shard_async(urls, politeness_delay, outcomes, workers):
+    """Crawl one shard of report URLs on this process's own browser, with `workers` pages"""
+
+    async def send(url, reports, error):
+        outcomes.put(("report", url, reports, error))
+
+    cache = PageCache()
+    try:
+        async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
+            await crawl_reports(crawler, cache, urls, HostThrottle(politeness_delay), send, workers)
+    finally:
+        cache.close()
+
+
+def crawl_report_shard(shard_index, urls, politeness_delay, outcomes, workers):
+    """Shard process entry point: puts ("report", url, reports or None, error or None) on the
+    outcomes queue as each report finishes, then ("done", shard_index, error or None)"""
+    try:
+        asyncio.run(crawl_report_shard_async(urls, politeness_delay, outcomes, workers))
+    except Exception as e:
+        outcomes.put(("done", shard_index, f"shard failed: {e}"))
+        raise
+    outcomes.put(("done", shard_index, None))
+
+
+def shard_workers(concurrency, shards):
+    """Browser pages per shard, so that all shards together open `concurrency` pages"""
+    return [concurrency // shards + (1 if shard < concurrency % shards else 0) for shard in range(shards)]
+
+
 
 async def js_interaction():
     """Extract files from all pagination pages"""
@@ -29,22 +250,9 @@ async def js_interaction():
     all_menus = set()
     main_article_urls = set()
     more_urls = set()
-    all_reports = []
     file_details_dict: Dict[str, set] = {} # Store more article detail URLs 
     load_more_dict: Dict[str, set] = {}
     page_links_dict: Dict[str, set] = {}  # Store pagination URLs per menu
-
-    def ensure_base_url(url):
-        """Convert relative URLs to absolute URLs and remove trailing '#'"""
-        # Convert relative URLs to absolute URLs
-        if not url.startswith(("http://", "https://")):
-            # Handle different relative path formats
-            if url.startswith("./"):
-                url = url[2:]
-            elif url.startswith("/"):
-                url = url[1:]
-            return base_url + url
-        return url
     
     # ---------------- Ectraction schemas ----------------
 
@@ -77,6 +285,14 @@ async def js_interaction():
             },
         ]
     }
+    page_numbers_schema = {
+        "name": "page_numbers",
+        "baseSelector": "nav.pagination.navigation a.page-numbers:not(.next):not(.prev)",
+        "fields": [
+            {"name": "number", "type": "text"},
+            {"name": "url", "type": "attribute", "attribute": "href"},
+        ]
+    }
     article_schema = {
         "name": "file_links",
         "baseSelector": "article.w-grid-item",
@@ -101,105 +317,158 @@ async def js_interaction():
             },
         ]
     }
-    pdf_links = {
-        "name": "xlsx_links",
-        "description":"Extract all XLSX titles and links",
-        "baseSelector": ".l-main .l-section.wpb_row.height_large .w-btn-wrapper",
-        "type": "list",
-        "fields": [
-            {
-                "name":"pdf",
-                "selector": "a[href$='.pdf']",
-                "type": "attribute",
-                "attribute": "href",
-                "multiple": True
-            }
-        ]
-    }
-    xlsx__links = {
-        "name": "xlsx_links",
-        "description":"Extract all XLSX titles and links",
-        "baseSelector": ".l-main .l-section.wpb_row.height_large .wpb_wrapper p",
-        "type": "list",
-        "fields": [
-            {
-                "name":"xlsx",
-                "selector": "a[href$='.xlsx']",
-                "type": "attribute",
-                "attribute": "href",
-                "multiple": True
-            }
-        ]
-    }
-    more_details = {
-        "name": "more_details",
-        "baseSelector": "body .l-main",
-        "type": "list",
-        "fields": [
-            {"name": "main_report_title","selector": "h1.entry-title","type": "text"},
-            {"name": "main_report_url", "selector":"a.w-btn.us-btn-style_6", "type": "attribute", "attribute": "href"},
-            {"name": "main_category","selector": ".main_category span","type": "text"},
-            {"name": "sub_category","selector": ".sub_category","type": "text"},
-            {"name": "post_month","selector": ".month span","type": "text"},
-            {"name":"post_year","selector": ".year span","type": "text"},
-            {"name": "overview","selector": ".report_short_description p","type": "text"},
-        ]
-    }
+
+    # ---------------- Crawl frontier ----------------#
+    # Every fetched page is recorded with its stage and result, so a restarted run skips completed pages.
+
+    frontier = CrawlFrontier(FRONTIER_PATH)
+    frontier.add("menu", [base_url])
+
+    # With NSO_CACHE=1, rendered pages are cached on disk (see nso_common.page_cache), so reruns only re-extract
+    cache = PageCache()
 
     # ---------------- Extract Menu Links ----------------#
-       
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
-        log_message(f"[FETCH]... ↓ {base_url}", "info")
-        config=CrawlerRunConfig (
+
+    menu_error = "no menu links found"
+    if frontier.pending("menu"):
+        async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
+            log_message(f"[FETCH]... ↓ {base_url}", "info")
+            config=CrawlerRunConfig (
+                cache_mode=CacheMode.BYPASS,
+                scan_full_page=True,
+                wait_for="body",  # Wait until banner is gone
+                session_id="hn_session",
+                extraction_strategy=JsonCssExtractionStrategy(schema = menu_links_schema),
+                magic=True,
+                js_code="document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
+            )
+            results: List[CrawlResult] = await cache.arun(crawler, base_url, config)
+            menu_urls = set()
+            for result in results:
+                if result.success:
+                    items = json.loads(result.extracted_content)
+                    for item in items:
+                        menu_url = ensure_base_url(item.get("url", ""), base_url)
+                        if menu_url != base_url + "#":
+                            menu_urls.add(menu_url)  # Add URL to the set
+                            log_message(f"[SCRAPE].. ◆ menu: {menu_url}", "info")
+            menu_error = crawl_error(results) or (None if menu_urls else menu_error)
+            if menu_error is None:
+                frontier.complete("menu", base_url, sorted(menu_urls))
+            else:
+                frontier.fail("menu", base_url, menu_error)  # retried on the next run
+
+    for menu_urls in frontier.results("menu").values():
+        all_menus.update(menu_urls)
+    if not all_menus:
+        # Nothing to crawl: stop before the output files, so knbs_files.json keeps the last good data
+        log_message(f"[ERROR] Menu page {base_url} could not be loaded ({menu_error}); stopping the run", "error")
+        cache.close()
+        frontier.close()
+        raise RuntimeError(f"menu page {base_url} could not be loaded: {menu_error}")
+
+    # ---------------- Pagination Loop for each menu links ----------------#
+    # Listing pages are server-rendered: nav_links is tried over plain HTTP before the browser.
+    # Page 1 lists the numbered pages, so /page/2/ ... /page/K/ are fetched together; the
+    # serial "next" walk is kept for menus that don't follow that pattern.
+
+    throttle = HostThrottle(POLITENESS_DELAY)
+
+    async def fetch_pagination_nav(crawler, static, page_url, menu_url, session_id=None):
+        """Return {"next", "numbered"} for one listing page (from the frontier if already done), None on failure"""
+        nav = frontier.result("pagination", page_url)
+        if nav is not None:
+            return nav
+        log_message(f"[FETCH]... ↓ {page_url}", "info")
+        config = CrawlerRunConfig(
             cache_mode=CacheMode.BYPASS,
             scan_full_page=True,
-            wait_for="body",  # Wait until banner is gone
-            session_id="hn_session",
-            extraction_strategy=JsonCssExtractionStrategy(schema = menu_links_schema),
+            wait_for="body .l-main",
+            extraction_strategy=JsonCssExtractionStrategy(schema=nav_links),
+            session_id=session_id,
             magic=True,
-            js_code="document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
+            js_code = "document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
         )
-        results: List[CrawlResult] = await crawler.arun(url=base_url,config=config,)
+        results: List[CrawlResult] = await cache.arun(crawler, page_url, config, fetch=lambda u, c: static.arun(crawler, u, c, static=True, require="body main.l-main"))
         for result in results:
             if result.success:
-                items = json.loads(result.extracted_content)
-                for item in items:
-                    menu_url = ensure_base_url(item.get("url", ""))
-                    if menu_url != base_url + "#":
-                        all_menus.add(menu_url)  # Add URL to the set
-                        log_message(f"[SCRAPE].. ◆ menu: {menu_url}", "info")
+                nav = {"next": "", "numbered": []}  # "" is stored for the last page
+                for item in json.loads(result.extracted_content):
+                    next_page = item.get("next_page", "")
+                    if next_page:
+                        nav["next"] = ensure_base_url(next_page, base_url)
+                for item in extract_schema(page_numbers_schema, page_url, result.html):
+                    number = item.get("number", "").strip()
+                    if number.isdigit() and item.get("url"):
+                        nav["numbered"].append([int(number), ensure_base_url(item["url"], base_url)])
+        if nav is None:
+            frontier.fail("pagination", page_url, "crawl failed")
+            return None
+        frontier.complete("pagination", page_url, nav, parent=menu_url)
+        return nav
+
+    def predict_pages(menu_url, first_nav):
+        """Page URLs 2..K from page 1's numbered links, or None when they don't follow {menu}page/N/"""
+        if not first_nav["numbered"]:
+            return None if first_nav["next"] else []
+        pattern = menu_url.rstrip("/") + "/page/{}/"
+        last_page = max(number for number, _ in first_nav["numbered"])
+        for number, href in first_nav["numbered"]:
+            if number > 1 and href.rstrip("/") + "/" != pattern.format(number):
+                return None
+        if first_nav["next"] and first_nav["next"].rstrip("/") + "/" != pattern.format(2):
+            return None
+        return [pattern.format(number) for number in range(2, last_page + 1)]
+
+    page_links = set()
+    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler, StaticFetcher() as static:
+        limit = asyncio.Semaphore(PAGINATION_CONCURRENCY)
+
+        async def fetch_predicted(page_url, menu_url):
+            async with limit:
+                await throttle.wait(page_url)
+                return await fetch_pagination_nav(crawler, static, page_url, menu_url)
 
-    # ---------------- Pagination Loop for each menu links ----------------#
-         
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
         for url in all_menus: # replace all_menus by all_menu_links if you want to use all_menus_links.json file above.
+            if url_rules.action(url) == "skip":
+                continue  # its pages would only be skipped later, so don't paginate it
             page_links = set() # initialize set
-            current_url = url
             # ✅ Add home page first
-            page_links.add(current_url)
-            while current_url:
-                log_message(f"[FETCH]... ↓ {current_url}", "info")
-                config = CrawlerRunConfig(
-                    cache_mode=CacheMode.BYPASS,
-                    scan_full_page=True,
-                    wait_for="body .l-main",
-                    extraction_strategy=JsonCssExtractionStrategy(schema=nav_links),
-                    session_id="hn_session",
-                    magic=True,
-                    js_code = "document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
-                )
-                results: List[CrawlResult] = await crawler.arun(url=current_url, config=config,)
-                next_url = None
-                for result in results:
-                    if result.success:
-                        items = json.loads(result.extracted_content)
-                        for item in items:
-                            next_page = item.get("next_page", "")
-                            if next_page:
-                                next_url = ensure_base_url(next_page)
-                                if next_url not in page_links:
-                                    page_links.add(next_url)
-                                    log_message(f"[SCRAPE].. ◆ pagination: {next_url}", "info")
+            page_links.add(url)
+            frontier.add("pagination", [url], parent=url)
+            first_nav = await fetch_pagination_nav(crawler, static, url, url, "hn_session")
+            if first_nav is None:
+                page_links_dict[url] = page_links
+                continue
+
+            predicted = predict_pages(url, first_nav) if PREDICT_PAGINATION else None
+            if predicted:
+                frontier.add("pagination", predicted, parent=url)
+                navs = await asyncio.gather(*(fetch_predicted(page_url, url) for page_url in predicted))
+                page_links.update(page_url for page_url, nav in zip(predicted, navs) if nav is not None and url_rules.action(page_url) != "skip")
+                log_message(f"[SCRAPE].. ◆ pagination: {len(predicted)} predicted pages for {url}", "info")
+                if all(nav is not None for nav in navs) and not navs[-1]["next"]:
+                    page_links_dict[url] = page_links
+                    continue
+                log_message(f"[WARN].... ⚠ predicted pages for {url} don't match the site, walking 'next' links", "warning")
+            elif predicted is None:
+                log_message(f"[WARN].... ⚠ no numbered pagination on {url}, walking 'next' links", "warning")
+
+            # Serial walk; pages already fetched above come straight from the frontier
+            walked = set()
+            current_url = url
+            while current_url and current_url not in walked:  # stop on a loop back to a page we already walked
+                walked.add(current_url)
+                nav = await fetch_pagination_nav(crawler, static, current_url, url, "hn_session")
+                if nav is None:
+                    break
+                next_url = nav["next"] or None
+                if next_url and url_rules.action(next_url) == "skip":
+                    break  # the rest of this chain would only be skipped
+                if next_url and next_url not in page_links:
+                    page_links.add(next_url)
+                    frontier.add("pagination", [next_url], parent=url)
+                    log_message(f"[SCRAPE].. ◆ pagination: {next_url}", "info")
                 current_url = next_url
 
             page_links_dict[url] = page_links # Store all pagination URLs for this menu
@@ -214,30 +483,40 @@ async def js_interaction():
 
     async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
         for url in page_links:
-            log_message(f"[FETCH]... ↓ {url}", "info")
-            config = CrawlerRunConfig(
-                cache_mode=CacheMode.BYPASS,
-                scan_full_page=True,
-                wait_for="body main.l-main .w-grid-list article.w-grid-item a.usg_btn_2",
-                extraction_strategy=JsonCssExtractionStrategy(schema=article_schema),
-                session_id="hn_session",
-                magic=True,
-                js_code="document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
-            )
-            results: List[CrawlResult] = await crawler.arun(url=url,config=config,)
-            if not results:
-                log_message("🚫 No results, stopping.", "warning")
-                break
+            article_urls = frontier.result("article", url)
+            if article_urls is None:
+                log_message(f"[FETCH]... ↓ {url}", "info")
+                config = CrawlerRunConfig(
+                    cache_mode=CacheMode.BYPASS,
+                    scan_full_page=True,
+                    wait_for="body main.l-main .w-grid-list article.w-grid-item a.usg_btn_2",
+                    extraction_strategy=JsonCssExtractionStrategy(schema=article_schema),
+                    session_id="hn_session",
+                    magic=True,
+                    js_code="document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
+                )
+                results: List[CrawlResult] = await cache.arun(crawler, url, config)
+                if not results:
+                    log_message("🚫 No results, stopping.", "warning")
+                    break
+                error = crawl_error(results)
+                if error is not None:
+                    frontier.fail("article", url, error)
+                    log_message(f"[WARN].... ⚠ {url} failed ({error}); it is retried on the next run", "warning")
+                    continue
+                article_urls = []
+                for result in results:
+                    if result.success:
+                        items = json.loads(result.extracted_content)
+                        article_urls.extend(item.get("url", "") for item in items)
+                frontier.complete("article", url, article_urls)
+
             extracted_any = False
-            for result in results:
-                if result.success:
-                    items = json.loads(result.extracted_content)
-                    for item in items:
-                        url = item.get("url", "")
-                        if url and url not in main_article_urls:
-                            main_article_urls.add(url)
-                            extracted_any = True
-                            log_message(f"[EXTRACT]. ■ Found article: {url}", "info")
+            for article_url in article_urls:
+                if article_url and article_url not in main_article_urls:
+                    main_article_urls.add(article_url)
+                    extracted_any = True
+                    log_message(f"[EXTRACT]. ■ Found article: {article_url}", "info")
 
             if not extracted_any:
                 log_message("🚫 No new items → last page reached.", "warning")
@@ -254,116 +533,88 @@ async def js_interaction():
 
         for page_urls in page_links_dict.values(): # loop over the lists of URLs for each menu
             for page_url in page_urls: # iterate each paginated page 
-                load_more_btn_urls = [
-                    "https://www.knbs.or.ke/statistical-abstracts/",
-                    "https://www.knbs.or.ke/economic-surveys/",
-                    "https://www.knbs.or.ke/county-statistical-abstracts/",
-                    "https://www.knbs.or.ke/general-publications/"
-                ]
-                skip_urls= [   
-                    "https://www.knbs.or.ke/about/",
-                    "https://www.knbs.or.ke/macroeconomic-statistics-directorate/",
-                    "https://www.knbs.or.ke/about/#vmc",
-                    "https://www.knbs.or.ke/videos/",
-                    "https://www.knbs.or.ke/board-of-directors/",
-                    "https://www.knbs.or.ke/reports/kenya-census-1999/",
-                    "https://www.knbs.or.ke/reports/kenya-census-2009/",
-                    "https://www.knbs.or.ke/reports/kenya-census-2019/",
-                    "https://www.knbs.or.ke/kenstats/",
-                    "https://www.knbs.or.ke/partners/",
-                    "https://www.knbs.or.ke/statistical-coordination-methods-directorate/",
-                    "https://www.knbs.or.ke/photos/",
-                    "https://www.knbs.or.ke/tenders/",
-                    "https://www.knbs.or.ke/ongoing-surveys/",
-                    "https://www.knbs.or.ke/portals/",
-                    "https://www.knbs.or.ke/statistical-releases/",
-                    "https://www.knbs.or.ke/about/#history",
-                    "https://www.knbs.or.ke/top-management/",
-                    "https://www.knbs.or.ke/about/#mandate",
-                    "https://www.knbs.or.ke/jobs/",
-                    "https://www.knbs.or.ke/director-general-office/",
-                    "https://www.knbs.or.ke/directorates/",
-                    "https://www.knbs.or.ke/knbs-sdgs/",
-                    "https://www.knbs.or.ke/service-delivery-charter/",
-                    "https://www.knbs.or.ke/quality-policy/",
-                    "https://www.knbs.or.ke/about/kenya-statistics-code-of-practice-kescop/",
-                    "https://www.knbs.or.ke/population-and-social-statistics-directorate/",
-                    "https://www.knbs.or.ke/iso-certification/",
-                    "https://www.knbs.or.ke/production-statistics-directorate/",
-                    "https://www.knbs.or.ke/internships/",
-                    "https://www.knbs.or.ke/strategic-plan/",
-                    "https://www.knbs.or.ke/data-revision-policy/",
-                    "https://www.knbs.or.ke/corporate-services-directorate/",
-                    "https://www.knbs.or.ke/news-and-events/page/4/",
-                    "https://www.knbs.or.ke/news-and-events/page/5/",
-                    "https://www.knbs.or.ke/news-and-events/page/9/",
-                    "https://www.knbs.or.ke/news-and-events/page/3/",
-                    "https://www.knbs.or.ke/news-and-events/page/10/",
-                    "https://www.knbs.or.ke/news-and-events/page/12/",
-                    "https://www.knbs.or.ke/news-and-events/page/15/",
-                    "https://www.knbs.or.ke/news-and-events/page/13/",
-                    "https://www.knbs.or.ke/news-and-events/page/14/",
-                    "https://www.knbs.or.ke/news-and-events/page/11/",
-                    "https://www.knbs.or.ke/news-and-events/",
-                    "https://www.knbs.or.ke/news-and-events/page/7/",
-                    "https://www.knbs.or.ke/news-and-events/page/17/",
-                    "https://www.knbs.or.ke/news-and-events/page/2/",
-                    "https://www.knbs.or.ke/news-and-events/page/8/",
-                    "https://www.knbs.or.ke/news-and-events/page/6/",
-                    "https://www.knbs.or.ke/news-and-events/page/16/"
-                ]
-               
-                if page_url in load_more_btn_urls :
+                action = url_rules.action(page_url)
+                if action == "load_more":
                     # 🔹 Applying custom condition for load_more_btn URLs
                     print(f"⚡ Special handling for {page_url}")
                     file_details = set() # ✅ reset once per page
-                    # JavaScript code to automatically click "Load More" until all content is loaded
-                    js_code = """
-                    (async () => {
-                        let previousCount = 0;
-                        while (true) {
-                            const items = document.querySelectorAll(".w-grid-item");
-                            if (items.length === previousCount) {
-                                console.log("✅ All items loaded.");
-                                break; // no new items loaded, stop
-                            }
-                            previousCount = items.length;
-
-                            const btn = document.querySelector("button.w-btn.us-btn-style_1");
-                            if (!btn) {
-                                console.log("✅ No Load More button found.");
-                                break; // no button, stop
-                            }
-
+                    # JavaScript code to automatically click "Load More" until all content is loaded.
+                    # Each click waits (MutationObserver) only until the new batch lands and the DOM is quiet,
+                    # and stops when the button is gone or a click adds nothing within LOAD_MORE_IDLE_MS.
+                    js_code = f"""
+                    (async () => {{
+                        const itemCount = () => document.querySelectorAll("article.w-grid-item").length;
+                        const loadMoreButton = () => document.querySelector("button.w-btn.us-btn-style_1:not(#us-set-cookie)");
+                        const waitForDom = (done, timeoutMs) => new Promise((resolve) => {{
+                            let timer;
+                            const finish = (ok) => {{ observer.disconnect(); clearTimeout(timer); resolve(ok); }};
+                            const observer = new MutationObserver(() => {{ if (done()) finish(true); }});
+                            observer.observe(document.body, {{ childList: true, subtree: true }});
+                            timer = setTimeout(() => finish(done()), timeoutMs);
+                            if (done()) finish(true);
+                        }});
+                        // Bounded by the page deadline: carousels and tickers never let the DOM go quiet
+                        const waitForQuiet = (quietMs, deadline) => new Promise((resolve) => {{
+                            let timer = setTimeout(done, quietMs);
+                            const cap = setTimeout(done, Math.max(0, deadline - Date.now()));
+                            const observer = new MutationObserver(() => {{ clearTimeout(timer); timer = setTimeout(done, quietMs); }});
+                            function done() {{ observer.disconnect(); clearTimeout(timer); clearTimeout(cap); resolve(); }}
+                            observer.observe(document.body, {{ childList: true, subtree: true }});
+                        }});
+
+                        const deadline = Date.now() + {LOAD_MORE_MAX_MS};
+                        for (let clicks = 0; clicks < {LOAD_MORE_MAX_CLICKS} && Date.now() < deadline; clicks++) {{
+                            const btn = loadMoreButton();
+                            if (!btn || btn.offsetParent === null) {{
+                                console.log("✅ No Load More button left.");
+                                break;
+                            }}
+                            const before = itemCount();
                             btn.click();
-                            console.log("🔄 Clicked Load More, waiting for new items...");
-                            await new Promise(r => setTimeout(r, 20000)); // wait 20s for new items
-                        }
-                    })();
+                            if (!(await waitForDom(() => itemCount() > before, {LOAD_MORE_IDLE_MS}))) {{
+                                console.log("✅ Grid stopped growing.");
+                                break;
+                            }}
+                            await waitForQuiet({LOAD_MORE_QUIET_MS}, deadline);
+                        }}
+                        console.log("✅ Loaded", itemCount(), "items.");
+                        window.__knbsLoadMoreDone = true;
+                    }})();
                     """
                     load_more = CrawlerRunConfig(
                         cache_mode=CacheMode.BYPASS,
                         scan_full_page=True,
-                        wait_for="document.querySelectorAll('article.w-grid-item').length > 100",
+                        wait_for="js:() => window.__knbsLoadMoreDone === true",
+                        wait_for_timeout=LOAD_MORE_MAX_MS + LOAD_MORE_IDLE_MS,
                         extraction_strategy=JsonCssExtractionStrategy(schema=more),
                         session_id="hn_session",
                         magic=True,
                         js_code=js_code,
-                        page_timeout= 30000
+                        page_timeout=LOAD_MORE_MAX_MS + LOAD_MORE_IDLE_MS,
                     )
-                    results: List[CrawlResult] = await crawler.arun(url=page_url,config=load_more,)
-                    for result in results:
-                        if result.success:
-                            items = json.loads(result.extracted_content)
-                            for item in items:
-                                more_url  = item.get("url", "")
-                                if  more_url and more_url not in file_details:
-                                    file_details.add(more_url)
+                    cached = frontier.result("more", page_url)
+                    if cached is not None:
+                        file_details.update(cached)
+                    else:
+                        results: List[CrawlResult] = await cache.arun(crawler, page_url, load_more)
+                        error = crawl_error(results)
+                        if error is not None:
+                            frontier.fail("more", page_url, error)
+                            log_message(f"[WARN].... ⚠ {page_url} failed ({error}); it is retried on the next run", "warning")
+                            continue
+                        for result in results:
+                            if result.success:
+                                items = json.loads(result.extracted_content)
+                                for item in items:
+                                    more_url  = item.get("url", "")
+                                    if  more_url and more_url not in file_details:
+                                        file_details.add(more_url)
+                        frontier.complete("more", page_url, sorted(file_details))
 
                     # ✅ store links for this specific page
                     file_details_dict[page_url] = file_details
-                elif page_url in skip_urls:
-                    print(f"⏭️ Skipping {page_url} as per skip list.")
+                elif action == "skip":
+                    print(f"⏭️ Skipping {page_url} as per URL rules.")
                     continue
                 else:
                     print(f"✅ Normal handling for {page_url}")
@@ -377,16 +628,25 @@ async def js_interaction():
                         magic=True,
                         js_code="document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
                     )
-                    results: List[CrawlResult] = await crawler.arun(url=page_url,config=config_more,)
-                    extracted_any = False
-                    for result in results:
-                        if result.success:
-                            items = json.loads(result.extracted_content)
-                            for item in items:
-                                more_url  = item.get("url", "")
-                                if  more_url and more_url not in more_urls:
-                                    more_urls.add(more_url)
-                                    extracted_any = True
+                    cached = frontier.result("more", page_url)
+                    if cached is not None:
+                        more_urls.update(cached)
+                    else:
+                        results: List[CrawlResult] = await cache.arun(crawler, page_url, config_more)
+                        error = crawl_error(results)
+                        if error is not None:
+                            frontier.fail("more", page_url, error)
+                            log_message(f"[WARN].... ⚠ {page_url} failed ({error}); it is retried on the next run", "warning")
+                            continue
+                        for result in results:
+                            if result.success:
+                                items = json.loads(result.extracted_content)
+                                for item in items:
+                                    more_url  = item.get("url", "")
+                                    if  more_url and more_url not in more_urls:
+                                        more_urls.add(more_url)
+                        frontier.complete("more", page_url, sorted(more_urls))
+                    extracted_any = bool(more_urls)
 
                     if not extracted_any:
                         print("🚫 No new 'more' items → probably last page reached.")
@@ -446,134 +706,148 @@ async def js_interaction():
 
     print(f"Extracted {len(unique_urls)} unique URLs to unique_knbs_urls.txt")
 
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
+    # ---------------- Report details (bounded worker pool) ----------------#
+    # File links are queued for download as soon as their report is written, so downloads
+    # run alongside the report crawl; the pipeline drains after the browser has closed.
+
+    download_folder = 'file_downloads'
+
+    async with DownloadPipeline(download_folder, log=log_message) as downloads:
         
         with open("unique_knbs_urls.txt", "r", encoding="utf-8") as f:
             urls = [line.strip() for line in f if line.strip()]
 
+        frontier.add("report", urls)
+
+        # Reports are streamed to knbs_files.ndjson in unique_knbs_urls.txt order as they finish,
+        # and their file links are collected from the same stream.
+        download_urls = set()
+        new_downloads = []
+
+        def collect_links(report):
+            for link in [report.get("main_report_url")] + report.get("pdf_files", []) + report.get("xlsx_files", []):
+                if link and link not in download_urls:
+                    download_urls.add(link)
+                    new_downloads.append(link)
+
+        async def queue_downloads():
+            """Hand newly seen links to the download pipeline (waits while its queue is full)"""
+            while new_downloads:
+                await downloads.put(new_downloads.pop(0))
+
+        async def record_report(url, reports, error):
+            """Save one report page's outcome, whichever process crawled it"""
+            if error is None:
+                frontier.complete("report", url, reports)
+            else:
+                frontier.fail("report", url, error)
+            reports_out.put(url, reports or [])
+            await queue_downloads()
+
+        reports_out = OrderedNdjsonWriter("knbs_files.ndjson", urls, on_record=collect_links)
+        pending = []
         for url in urls:
-            # 🔥 Reset per report
-            pdf_files = []
-            xlsx_files = []
-            
-            # ---------------- PDF extraction ----------------
-
-            config_pdf = CrawlerRunConfig(
-                cache_mode=CacheMode.BYPASS,
-                scan_full_page=True,
-                wait_for=".l-main .l-section.wpb_row.height_large ",
-                extraction_strategy=JsonCssExtractionStrategy(schema=pdf_links),
-                session_id="hn_session",
-                magic=True,
-                js_code="document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
-            )
-            results: List[CrawlResult] = await crawler.arun(url=url,config=config_pdf,)
-            for result in results:
-                if result.success:
-                    items = json.loads(result.extracted_content)
-                    for item in items:
-                        pdf_link = item.get("pdf", [])
-                        if pdf_link and pdf_link not in pdf_files:
-                            pdf_files.append(pdf_link)
+            done = frontier.result("report", url)
+            if done is not None:
+                reports_out.put(url, done)  # finished by an earlier, interrupted run
+            else:
+                pending.append(url)
+        await queue_downloads()
 
-            # ---------------- XLSX extraction ----------------
-
-            config_xlsx = CrawlerRunConfig(
-                cache_mode=CacheMode.BYPASS,
-                scan_full_page=True,
-                wait_for=".l-main .l-section.wpb_row.height_large ",
-                extraction_strategy=JsonCssExtractionStrategy(schema=xlsx__links),
-                session_id="hn_session",
-                magic=True,
-                js_code="document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
-            )
-            results: List[CrawlResult] = await crawler.arun(url=url,config=config_xlsx,)
-            for result in results:
-                if result.success:
-                    items = json.loads(result.extracted_content)
-                    for item in items:
-                        xlsx_link = item.get("xlsx", [])
-                        if xlsx_link and xlsx_link not in xlsx_files:
-                            xlsx_files.append(xlsx_link)
-
-            # ---------------- Main Report extraction ----------------
-            
-            config_more = CrawlerRunConfig(
-                cache_mode=CacheMode.BYPASS,
-                scan_full_page=True,
-                wait_for="body main.l-main",
-                extraction_strategy=JsonCssExtractionStrategy(schema=more_details),
-                session_id="hn_session",
-                magic=True,
-                js_code="document.querySelector('.l-cookie button#us-set-cookie.w-btn.us-btn-style_1')?.click();"
-            )
-            results: List[CrawlResult] = await crawler.arun(url=url,config=config_more,)
-            for result in results:
-                if result.success:
-                    items = json.loads(result.extracted_content)
-                    for item in items:
-                        main_url = item.get("main_report_url", "")
-                        # Remove main_report_url from pdf_files if present
-                        pdf_files_cleaned = [link for link in pdf_files if link != main_url]
-                        report = {
-                            "main_report_title": item.get("main_report_title", ""),
-                            "main_category": item.get("main_category", ""),
-                            "sub_category": item.get("sub_category", ""),
-                            "post_month": item.get("post_month", ""),
-                            "post_year": item.get("post_year", ""),
-                            "overview": item.get("overview", ""),
-                            "main_report_url": main_url,
-                            "pdf_files": pdf_files_cleaned,
-                            "xlsx_files": xlsx_files,
-                        }
-                        all_reports.append(report)
+        try:
+            shard_count = min(REPORT_SHARDS, REPORT_CONCURRENCY)  # every shard needs at least one browser page
+            if shard_count > 1 and len(pending) > 1:
+                # Each shard process runs its own browser with its share of KNBS_REPORT_CONCURRENCY
+                # pages, and the per-host delay is scaled, so the shards together stay within the
+                # page budget and as polite as one process. Shards send every report back over a
+                # queue as it finishes, so the frontier, knbs_files.ndjson (whose reorder buffer
+                # restores unique_knbs_urls.txt order) and the downloads keep up with them.
+                shards = [[url for url in pending if shard_of(url, shard_count) == shard] for shard in range(shard_count)]
+                shards = [shard_urls for shard_urls in shards if shard_urls]
+                workers = shard_workers(REPORT_CONCURRENCY, len(shards))
+                log_message(f"[INIT].... → Crawling {len(pending)} of {len(urls)} reports in {len(shards)} processes with {REPORT_CONCURRENCY} browser pages", "info")
+                loop = asyncio.get_running_loop()
+                context = multiprocessing.get_context("spawn")
+                recorded = set()
+                shard_errors = {}
+
+                async def receive(outcomes, processes):
+                    """Record outcomes from the shards as they arrive, until every shard is finished"""
+                    finished = set()
+                    while len(finished) < len(processes):
+                        try:
+                            outcome = await loop.run_in_executor(None, outcomes.get, True, 1.0)
+                        except queue.Empty:
+                            # Queue drained: a shard that has exited without saying so crashed
+                            for shard_index, process in enumerate(processes):
+                                if shard_index not in finished and not process.is_alive():
+                                    finished.add(shard_index)
+                                    shard_errors[shard_index] = f"shard exited with code {process.exitcode}"
+                                    log_message(f"[ERROR] Report shard {shard_index} {shard_errors[shard_index]}", "error")
+                            continue
+                        if outcome[0] == "done":
+                            _, shard_index, error = outcome
+                            finished.add(shard_index)
+                            if error is not None:
+                                shard_errors[shard_index] = error
+                                log_message(f"[ERROR] Report shard {shard_index} failed: {error}", "error")
+                            continue
+                        _, url, reports, error = outcome
+                        recorded.add(url)
+                        await record_report(url, reports, error)
+
+                with context.Manager() as manager:
+                    outcomes = manager.Queue()
+                    processes = [
+                        context.Process(
+                            target=crawl_report_shard,
+                            args=(shard_index, shard_urls, POLITENESS_DELAY * len(shards), outcomes, workers[shard_index]),
+                        )
+                        for shard_index, shard_urls in enumerate(shards)
+                    ]
+                    try:
+                        for process in processes:
+                            process.start()
+                        await receive(outcomes, processes)
+                    except BaseException:
+                        # Cancelled or failed: stop the shard browsers instead of blocking until they finish
+                        for process in processes:
+                            if process.is_alive():
+                                process.terminate()
+                        raise
+                    finally:
+                        for process in processes:
+                            if process.pid is not None:
+                                await loop.run_in_executor(None, process.join)
+
+                # A crashed shard only loses the reports it hadn't sent yet
+                for shard_index, shard_urls in enumerate(shards):
+                    for url in shard_urls:
+                        if url not in recorded:
+                            await record_report(url, None, shard_errors.get(shard_index, "shard failed"))
+            else:
+                workers = max(1, min(REPORT_CONCURRENCY, len(pending)))
+                log_message(f"[INIT].... → Crawling {len(pending)} of {len(urls)} reports with {workers} workers", "info")
+                async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
+                    await crawl_reports(crawler, cache, pending, throttle, record_report)
+        finally:
+            reports_out.close()
 
     # ---------------- ✅ Save output as JSON ----------------
-    
-    with open("knbs_files.json", "w", encoding="utf-8") as f:
-        json.dump(all_reports, f, ensure_ascii=False, indent=4)
-    log_message(f"[COMPLETE] Extracted {len(all_reports)} reports → knbs_files.json", "success")
-    # ---------------- Load JSON data ---------------- #
-    with open('knbs_files.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    # ---------------- Collect all URLs ---------------- #
-    urls = []
-    for entry in data:
-        if entry.get('main_report_url'):
-            urls.append(entry['main_report_url'])
-        urls.extend(entry.get('pdf_files', []))
-        urls.extend(entry.get('xlsx_files', []))
-    
-    # To avoid duplication in urls.txt, convert the urls list to a set before writing to the file. A set automatically removes duplicate values. 
-    unique_urls = set(urls)
+    # knbs_files.json (read by the API) is rebuilt from the stream without loading it all at once
+
+    report_count = write_json_array(read_ndjson("knbs_files.ndjson"), "knbs_files.json")
+    log_message(f"[COMPLETE] Extracted {report_count} reports → knbs_files.json", "success")
 
     # ---------------- Save URLs to a file ---------------- #
     with open('urls.txt', 'w', encoding='utf-8') as out:
-        for url in sorted(unique_urls):  # sorting for consistency
+        for url in sorted(download_urls):  # sorting for consistency
             out.write(url + '\n')
     
     # //////////////////////////////////////////////////////////// #
     
-    # ---------------- Download files into a folder ---------------- #
-    download_folder = 'file_downloads'
-    os.makedirs(download_folder, exist_ok=True)
-
-    with open('urls.txt', 'r', encoding='utf-8') as f:
-        urls = [line.strip() for line in f if line.strip()]
-
-    failed = []
-
-    for url in urls:
-        filename = os.path.join(download_folder, url.split('/')[-1])
-        try:
-            response = requests.get(url, timeout=60, verify=False)
-            response.raise_for_status()
-            with open(filename, 'wb') as f_out:
-                f_out.write(response.content)
-            log_message(f"[DOWNLOAD] ✓ {filename}", "success")
-        except Exception as e:
-            log_message(f"[ERROR] Failed to download {url}: {e}", "error")
-            failed.append(url)
+    # ---------------- Downloads (already finished by the pipeline) ---------------- #
+    failed = downloads.failed
 
     # Save failed URLs for retry
     if failed:
@@ -584,6 +858,18 @@ async def js_interaction():
     else:
         log_message("[COMPLETE] ● All files downloaded successfully", "success")
 
+    log_message(f"[CACHE]... page cache: {cache.hits} hits, {cache.misses} misses", "info")
+    cache.close()
+
+    # The run finished, so the next one starts a fresh crawl instead of resuming this one,
+    # unless pages failed: then the next run retries just those and reuses the rest
+    failures = frontier.failures()
+    if failures:
+        log_message(f"[WARN].... ⚠ {failures} pages failed; the next run retries them", "warning")
+    else:
+        frontier.reset()
+    frontier.close()
+
 
 
 async def main():
@@ -0,0 +1,111 @@
+import asyncio
+import secrets
+import threading
+from collections import deque
+from itertools import islice
+from typing import List, Optional, Tuple
+
+LOG_HISTORY = 1000  # events kept for replay; older ones are dropped
+MAX_LAG = 200  # a subscriber further behind than this skips ahead to the newest events
+
+
+class LogHub:
+    """Broadcasts log events to every /logs subscriber with bounded memory
+
+    Events get increasing ids and live in a fixed-size ring buffer. Subscribers
+    don't own a queue: each keeps its own cursor (the last id it sent) and reads
+    everything after it, so every viewer sees every event, and a reconnecting
+    EventSource resumes from its Last-Event-ID. A subscriber that falls behind
+    never holds memory: its missed events are counted and reported as one
+    "skipped" notice instead. A new viewer starts at the newest max_lag events
+    without a notice. Ids sent to clients carry a per-process epoch, so an id
+    from before a restart starts a new viewer instead of hiding events.
+    """
+
+    def __init__(self, capacity: int = LOG_HISTORY, max_lag: int = MAX_LAG):
+        self.max_lag = max_lag
+        self.epoch = secrets.token_hex(4)
+        self._events = deque(maxlen=capacity)
+        self._last_id = 0
+        self._dropped_through = 0  # highest id evicted from the buffer
+        self._cleared_through = 0  # highest id removed by clear() (not reported as skipped)
+        self._changed = threading.Condition()
+        self._loop_events = {}  # event loop -> asyncio.Event its waiters share until the next publish
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, entry: dict) -> int:
+        with self._changed:
+            self._last_id += 1
+            if len(self._events) == self._events.maxlen:
+                self._dropped_through = self._events[0][0]
+            self._events.append((self._last_id, entry))
+            self._changed.notify_all()
+            loop_events, self._loop_events = self._loop_events, {}
+            event_id = self._last_id
+        # One wake-up per event loop, however many subscribers wait on it; publish may run on any thread
+        for loop, event in loop_events.items():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # loop already closed
+                pass
+        return event_id
+
+    def clear(self):
+        """Forget the buffered events, so new subscribers start from the next one"""
+        with self._changed:
+            self._events.clear()
+            self._cleared_through = self._last_id
+
+    def event_id(self, cursor: int) -> str:
+        """Id sent to the client for an event (its Last-Event-ID after a reconnect)"""
+        return f"{self.epoch}-{cursor}"
+
+    def cursor(self, last_event_id: Optional[str]) -> int:
+        """Starting cursor for a subscriber: its Last-Event-ID if valid, else the newest max_lag events"""
+        epoch, _, cursor = (last_event_id or "").partition("-")
+        with self._changed:
+            if epoch == self.epoch and cursor.isdigit() and int(cursor) <= self._last_id:
+                return int(cursor)
+            # New viewer (or an id from another process): events before it connected are not "skipped"
+            return max(self._dropped_through, self._cleared_through, self._last_id - self.max_lag)
+
+    def read(self, cursor: int) -> Tuple[List[Tuple[int, dict]], int]:
+        """Events after cursor (at most max_lag of them) and how many were skipped"""
+        with self._changed:
+            return self._read(cursor)
+
+    def wait(self, cursor: int, timeout: float) -> Tuple[List[Tuple[int, dict]], int]:
+        """Like read(), but block up to timeout seconds for an event after cursor"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._events and self._events[-1][0] > cursor, timeout)
+            return self._read(cursor)
+
+    async def wait_async(self, cursor: int, timeout: float) -> Tuple[List[Tuple[int, dict]], int]:
+        """wait() for subscribers on an event loop: suspends the task, not a thread"""
+        with self._changed:
+            if self._events and self._events[-1][0] > cursor:
+                return self._read(cursor)
+            loop = asyncio.get_running_loop()
+            event = self._loop_events.get(loop)
+            if event is None:
+                event = self._loop_events[loop] = asyncio.Event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.read(cursor)
+
+    def _read(self, cursor):
+        # Ids in the buffer are consecutive, so the cursor gives the start index directly
+        skipped = max(0, self._dropped_through - max(cursor, self._cleared_through))
+        if not self._events:
+            return [], skipped
+        start = max(0, cursor - self._events[0][0] + 1)
+        behind = len(self._events) - start
+        if behind > self.max_lag:
+            skipped += behind - self.max_lag
+            start = len(self._events) - self.max_lag
+        return list(islice(self._events, start, None)), skipped
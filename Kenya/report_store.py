@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+
+MAX_PAGE_SIZE = 500
+
+
+# Fields searched by q; the same ones /search indexes
+SEARCH_FIELDS = ("main_report_title", "overview", "main_category", "sub_category")
+
+
+def record_has_files(record):
+    return bool(record.get("pdf_files") or record.get("xlsx_files") or record.get("main_report_url"))
+
+
+def search_words(text):
+    """Words of text as the /search index sees them: lowercased, accents removed"""
+    text = unicodedata.normalize("NFD", text.lower())
+    return re.findall(r"[^\W_]+", "".join(char for char in text if not unicodedata.combining(char)))
+
+
+class ReportStore:
+    """knbs_files.json held in memory with per-field indexes, for the /get-data queries
+
+    The file is read once and re-read only by refresh() (called when a scrape
+    finishes and before each API response) and only if it changed on disk. Each load builds a new snapshot
+    that is swapped in whole, so requests never see a half-built index.
+    """
+
+    def __init__(self, path: str = "knbs_files.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._snapshot = None
+
+    def refresh(self) -> bool:
+        """Reload the file if its mtime or size changed; returns whether it was reloaded"""
+        with self._lock:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return False
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            snapshot = self._build(json.loads(raw.decode("utf-8")))
+            snapshot["version"] = hashlib.sha256(raw).hexdigest()  # identifies the data for ETags and payload caches
+            snapshot["mtime"] = stat.st_mtime
+            self._snapshot = snapshot
+            self._signature = signature
+            return True
+
+    @property
+    def snapshot(self) -> dict:
+        """The current load: records, indexes, version and mtime, all of the same data"""
+        return self._load()
+
+    @property
+    def facets(self) -> dict:
+        """Totals and filter values of the whole dataset, for the dashboard's stats and dropdowns"""
+        return self._load()["facets"]
+
+    @property
+    def records(self) -> List[dict]:
+        return self._load()["records"]
+
+    @property
+    def version(self) -> str:
+        return self._load()["version"]
+
+    @property
+    def last_modified(self) -> float:
+        return self._load()["mtime"]
+
+    def _load(self):
+        if self._snapshot is None:
+            self.refresh()
+        return self._snapshot
+
+    @staticmethod
+    def _build(records):
+        """Index record positions by category, year, month and whether they have files"""
+        indexes: Dict[str, Dict[str, List[int]]] = {"category": {}, "year": {}, "month": {}}
+        with_files = []
+        search_text = []
+        files = 0
+        for position, record in enumerate(records):
+            indexes["category"].setdefault(str(record.get("main_category") or "").strip(), []).append(position)
+            indexes["year"].setdefault(str(record.get("post_year") or "").strip(), []).append(position)
+            indexes["month"].setdefault(str(record.get("post_month") or "").strip(), []).append(position)
+            if record_has_files(record):
+                with_files.append(position)
+            files += len(record.get("pdf_files") or []) + len(record.get("xlsx_files") or [])
+            # " word word ": " term" in it finds a word starting with term, like /search's prefix match
+            words = search_words(" ".join(str(record.get(field) or "") for field in SEARCH_FIELDS))
+            search_text.append(" " + " ".join(words) + " ")
+        by_number = lambda value: int(value) if value.isdigit() else 0
+        facets = {
+            "total": len(records),
+            "files": files,
+            "categories": sorted(value for value in indexes["category"] if value),
+            "years": sorted((value for value in indexes["year"] if value), key=by_number, reverse=True),
+            "months": sorted((value for value in indexes["month"] if value), key=by_number),
+        }
+        return {
+            "records": records, "indexes": indexes, "with_files": with_files, "search_text": search_text,
+            "facets": facets,
+        }
+
+    def query(
+        self,
+        page: int = 1,
+        page_size: int = 50,
+        category: Optional[str] = None,
+        year: Optional[str] = None,
+        month: Optional[str] = None,
+        has_files: bool = False,
+        q: Optional[str] = None,
+    ) -> dict:
+        """One page of the records matching every given filter, in file order"""
+        snapshot = self._load()
+        page = max(1, page)
+        page_size = min(max(1, page_size), MAX_PAGE_SIZE)
+
+        # Intersect the index lists, smallest first; no filters means every record
+        candidates = []
+        for field, value in (("category", category), ("year", year), ("month", month)):
+            if value:
+                candidates.append(snapshot["indexes"][field].get(value.strip(), []))
+        if has_files:
+            candidates.append(snapshot["with_files"])
+        candidates.sort(key=len)
+        if candidates:
+            matches = set(candidates[0])
+            for positions in candidates[1:]:
+                matches.intersection_update(positions)
+            positions = sorted(matches)
+        else:
+            positions = range(len(snapshot["records"]))
+
+        if q:
+            terms = [" " + word for word in search_words(q)]
+            search_text = snapshot["search_text"]
+            positions = [p for p in positions if all(term in search_text[p] for term in terms)]
+
+        records = snapshot["records"]
+        category_counts: Dict[str, int] = {}
+        for p in positions:
+            category = str(records[p].get("main_category") or "").strip()
+            category_counts[category] = category_counts.get(category, 0) + 1
+        total = len(positions)
+        start = (page - 1) * page_size
+        return {
+            "data": [records[p] for p in positions[start:start + page_size]],
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "pages": (total + page_size - 1) // page_size,
+            "category_counts": category_counts,  # of every match, not just this page
+        }
@@ -0,0 +1,143 @@
+import html
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Optional
+
+MAX_LIMIT = 100
+
+# bm25 column weights: a hit in the title counts far more than one in the overview
+WEIGHTS = {"title": 10.0, "overview": 1.0, "category": 3.0, "sub_category": 2.0}
+
+# snippet() marks hits with these; they are stripped from indexed text, so the rest can be HTML-escaped safely
+MARK_START, MARK_END = "\x02", "\x03"
+
+
+def column(value) -> str:
+    """Text indexed for one field"""
+    return str(value or "").replace(MARK_START, "").replace(MARK_END, "")
+
+
+def snippet_html(snippet: str) -> str:
+    """Snippet with the scraped text HTML-escaped and hits wrapped in <mark>"""
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def match_expression(text: str) -> Optional[str]:
+    """FTS5 query for free text: every word must match, each as a prefix ("infl" finds "inflation")"""
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return " AND ".join(f'"{word}"*' for word in words)
+
+
+class SearchIndex:
+    """SQLite FTS5 index over the records of knbs_files.json, for /search
+
+    build() writes a fresh database next to the live one and swaps it in with
+    os.replace, so searches keep working while a new index is built. Rows keep
+    the record's position in the file, so results map back to ReportStore.
+    """
+
+    def __init__(self, path: str = "knbs_search.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def version(self) -> Optional[str]:
+        """Data version the current index was built from (None if there is no index)"""
+        if not os.path.exists(self.path):
+            return None
+        conn = sqlite3.connect(self.path)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            return row[0] if row else None
+        except sqlite3.DatabaseError:
+            return None
+        finally:
+            conn.close()
+
+    def ensure(self, records: List[dict], version: str) -> bool:
+        """Build the index unless it already holds this data version; returns whether it was built"""
+        with self._lock:
+            if self.version() == version:
+                return False
+            self._build(records, version)
+            return True
+
+    def build(self, records: List[dict], version: str):
+        """Index records (in file order) and swap the new index in"""
+        with self._lock:
+            self._build(records, version)
+
+    def _build(self, records, version):
+        temp_path = self.path + ".building"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        conn = sqlite3.connect(temp_path)
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE reports USING fts5("
+                "title, overview, category, sub_category, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            conn.executemany(
+                "INSERT INTO reports (rowid, title, overview, category, sub_category) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        position,
+                        column(record.get("main_report_title")),
+                        column(record.get("overview")),
+                        column(record.get("main_category")),
+                        column(record.get("sub_category")),
+                    )
+                    for position, record in enumerate(records)
+                ),
+            )
+            conn.execute("INSERT INTO reports (reports) VALUES ('optimize')")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (version,))
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(temp_path, self.path)
+
+    def search(self, text: str, limit: int = 20, offset: int = 0) -> dict:
+        """Best matches first: [{"position", "score", "snippet"}] plus the total number of matches
+
+        The snippet is HTML: the matched text is escaped, only the <mark> tags around hits are markup.
+        """
+        expression = match_expression(text)
+        if expression is None:
+            return {"total": 0, "results": []}
+        limit = min(max(1, limit), MAX_LIMIT)
+        weights = ", ".join(str(weight) for weight in WEIGHTS.values())
+        conn = sqlite3.connect(self.path)
+        try:
+            total = conn.execute("SELECT count(*) FROM reports WHERE reports MATCH ?", (expression,)).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT rowid, bm25(reports, {weights}) AS rank, "
+                "snippet(reports, -1, ?, ?, '…', 12) "
+                "FROM reports WHERE reports MATCH ? ORDER BY rank LIMIT ? OFFSET ?",
+                (MARK_START, MARK_END, expression, limit, max(0, offset)),
+            ).fetchall()
+        finally:
+            conn.close()
+        return {
+            "total": total,
+            "results": [
+                {"position": rowid, "score": round(-rank, 4), "snippet": snippet_html(snippet)}
+                for rowid, rank, snippet in rows
+            ],
+        }
+
+    def positions(self, text: str) -> List[int]:
+        """Positions of every matching record, in file order (for filtering on the client)"""
+        expression = match_expression(text)
+        if expression is None:
+            return []
+        conn = sqlite3.connect(self.path)
+        try:
+            rows = conn.execute("SELECT rowid FROM reports WHERE reports MATCH ? ORDER BY rowid", (expression,)).fetchall()
+        finally:
+            conn.close()
+        return [rowid for (rowid,) in rows]
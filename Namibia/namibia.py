@@ -1,46 +1,68 @@
 import asyncio
 import json
 import os
+import re
 from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode, JsonCssExtractionStrategy, BrowserConfig, CrawlResult
 import csv
 import pandas as pd
 from typing import Dict, List, Set
 from urllib.parse import urljoin
-import requests
+import sys
 import urllib3
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # repo root, for nso_common
+from nso_common.downloader import DownloadPipeline
+from nso_common.ndjson import NdjsonWriter, read_ndjson, write_json_array
+from nso_common.page_cache import PageCache
+from nso_common.static_fetch import StaticFetcher
+from nso_common.urls import ensure_base_url
 # Disable only the single InsecureRequestWarning from urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+HEADLESS = os.environ.get("NSA_HEADLESS", "0") == "1"  # run Chromium without a window
+BROWSER_PAGES = int(os.environ.get("NSA_BROWSER_PAGES", "4"))  # sections running at once, each on its own browser page
+PUB_FOLDERS_SINGLE_PASS = os.environ.get("NSA_PUB_SINGLE_PASS", "1") == "1"  # open all publication folders in one page load
+PUB_FOLDER_CONCURRENCY = int(os.environ.get("NSA_PUB_FOLDER_CONCURRENCY", "4"))  # folders opened at the same time in single-pass mode
+PUB_FOLDER_TIMEOUT_MS = 30000  # max wait for one folder's table to load
+
 
-async def namibia():
+async def namibia(headless: bool = HEADLESS):
 
     print("Extracting data from Namibia Statistics Agency (NSA) website.")
-    def ensure_base_url(url):
-        """Convert relative URLs to absolute URLs and remove trailing '#'"""
-        # Convert relative URLs to absolute URLs
-        if not url.startswith(("http://", "https://")):
-            # Handle different relative path formats
-            if url.startswith("./"):
-                url = url[2:]
-            elif url.startswith("/"):
-                url = url[1:]
-            return base_url + url
-        return url
     base_url = "https://nsa.org.na/"
     pub_url = "https://nsa.org.na/publications/"
     census_url = "https://nsa.org.na/census/"
     nss_url = "https://nsa.org.na/nss/"
     nsdi_url = "https://nsa.org.na/nsdi/"
+    static = StaticFetcher(patterns=[re.escape(census_url)])  # census page is server-rendered: plain HTTP first
+    cache = PageCache()  # with NSO_CACHE=1, rendered pages are cached on disk, so reruns only re-extract
     nss_menu_names: Set[str] = set()
     nsdi_menu_names: Set[str] = set()
     menu_links = set()
     nss_nav_links = []
     nsdi_nav_links = []
-    nss_docs = []
-    nsdi_docs = []
-    home_docs = []    
-    pub_docs = []
-    census_docs = []
+    # Each section streams its documents to NDJSON as they are extracted
+    nss_docs = NdjsonWriter("nss_docs.ndjson")
+    nsdi_docs = NdjsonWriter("nsdi_docs.ndjson")
+    home_docs = NdjsonWriter("home_page_docs.ndjson")
+    pub_docs = NdjsonWriter("pub_docs.ndjson")
+    census_docs = NdjsonWriter("census_docs.ndjson")
+
+    download_folder = 'file_downloads'
+    downloads = DownloadPipeline(download_folder)  # started with the browser below
+
+    async def queue_downloads(docs):
+        """Queue a finished section's links, so its files download while other sections still crawl"""
+        for item in read_ndjson(docs.path):
+            await downloads.put(item.get("link"))
+
+    async def save_section(docs, json_path):
+        """Close a section's NDJSON stream, mirror it to the section's JSON file and queue its links"""
+        docs.close()
+        count = write_json_array(read_ndjson(docs.path), json_path)
+        await queue_downloads(docs)
+        return count
+
     menu_links_schema = {
     "name": "menu_links",
     "baseSelector": "section .dt-nav-menu-horizontal a ",
@@ -86,6 +108,52 @@ async def namibia():
             {"name": "link", "selector": ".col-link a.dlp-download-link", "type": "attribute", "attribute": "href"},
         ],
     }
+    # Same rows as pub_docs_schema, but every row carries the id of the folder it belongs to
+    pub_rows_schema = {
+        "name": "publication_rows",
+        "baseSelector": "li.dlp-folder tbody tr.post-row",
+        "type": "list",
+        "fields": pub_docs_schema["fields"] + [
+            {"name": "category_id", "type": "attribute", "attribute": "data-category-id"},
+        ],
+    }
+    # Opens every publication folder on one page (a few at a time) and tags each loaded row
+    # with its folder's data-category-id; sets window.__nsaFoldersLoaded when finished.
+    open_all_folders_js = f"""
+        (async () => {{
+            const folders = Array.from(document.querySelectorAll("li.dlp-folder[data-category-id]"));
+            const waitLoaded = (folder) => new Promise((resolve) => {{
+                if (folder.classList.contains("table-loaded")) return resolve(true);
+                const timer = setTimeout(() => {{ observer.disconnect(); resolve(false); }}, {PUB_FOLDER_TIMEOUT_MS});
+                const observer = new MutationObserver(() => {{
+                    if (folder.classList.contains("table-loaded")) {{
+                        clearTimeout(timer);
+                        observer.disconnect();
+                        resolve(true);
+                    }}
+                }});
+                observer.observe(folder, {{ attributes: true, attributeFilter: ["class"] }});
+            }});
+            const openFolder = async (folder) => {{
+                const clickable = folder.querySelector(".dlp-icon.folder, .dlp-category-name");
+                if (!clickable) return;
+                clickable.click();
+                if (!(await waitLoaded(folder))) {{
+                    console.log("⚠️ Timed out loading folder:", folder.dataset.categoryId);
+                }}
+            }};
+            const queue = folders.slice();
+            const workers = Array.from({{ length: {PUB_FOLDER_CONCURRENCY} }}, async () => {{
+                while (queue.length) await openFolder(queue.shift());
+            }});
+            await Promise.all(workers);
+            document.querySelectorAll("li.dlp-folder tbody tr.post-row").forEach((row) => {{
+                row.setAttribute("data-category-id", row.closest("li.dlp-folder").dataset.categoryId);
+            }});
+            console.log("✅ Opened", folders.length, "folders");
+            window.__nsaFoldersLoaded = true;
+        }})();
+    """
     census_main_report_schema = {
             "name": "download report",
             "baseSelector": "li.menu-item-10792",  # Each item container
@@ -155,66 +223,65 @@ async def namibia():
         ],
     }
 
-# ------------------------- NSS NAVIGATION LINKS EXTRACTION ------------------------- #
+    async def extract_nss(crawler):
+        """NSS: navigation menu, home page documents and DOCUMENTS page"""
+
+        # ------------------------- NSS NAVIGATION LINKS EXTRACTION ------------------------- #
 
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
-        
         config = CrawlerRunConfig(
             cache_mode=CacheMode.BYPASS,
             scan_full_page=True,
             wait_for="body section",
-            session_id="hn_session",
+            session_id="nss_session",
             extraction_strategy=JsonCssExtractionStrategy(schema=nss_nsdi_nav_schema),
             magic=False,
         )
-        
-        results: List[CrawlResult] = await crawler.arun(url=nss_url, config=config)
-        
+
+        results: List[CrawlResult] = await cache.arun(crawler, nss_url, config)
+
         for result in results:
             if result.success and result.extracted_content:
                 try:
                     items = json.loads(result.extracted_content)
                     print(f"Extracted {len(items)} raw menu items")
-                    
+
                     for item in items:
                         menu_name = item.get("menu_name", "").strip()
                         menu_url = item.get("url", "").strip()
-                        
+
                         # Skip empty or invalid items
                         if not menu_name or not menu_url:
                             continue
-                            
+
                         # Only add if we haven't seen this menu name before
                         if menu_name not in nss_menu_names:
                             nss_menu_names.add(menu_name)
                             # Create dictionary with menu_name as key and url as value
                             nss_nav_links.append({menu_name: menu_url})
-                        
-                            
+
                 except json.JSONDecodeError as e:
                     print(f"Error parsing JSON: {e}")
                     continue
 
         print(f"After deduplication: {len(nss_nav_links)} unique menu links")
 
-    # Save the unique results
-    with open("nss_menu_links.json", "w", encoding="utf-8") as f:
-        json.dump(nss_nav_links, f, indent=4)
-    
-    print(f"Saved {len(nss_nav_links)} unique menu links to nss_menu_links.json")
+        # Save the unique results
+        with open("nss_menu_links.json", "w", encoding="utf-8") as f:
+            json.dump(nss_nav_links, f, indent=4)
+
+        print(f"Saved {len(nss_nav_links)} unique menu links to nss_menu_links.json")
 
-# -------------------- HOME PAGE DOCUMENTS EXTRACTION -----------------
+        # -------------------- HOME PAGE DOCUMENTS EXTRACTION -----------------
 
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
         config = CrawlerRunConfig(
             cache_mode=CacheMode.BYPASS,
             scan_full_page=True,
             wait_for=".e-con-inner .elementor-icon-box-title",
-            session_id="hn_session",
+            session_id="nss_session",
             extraction_strategy=JsonCssExtractionStrategy(schema=nss_homefile_schema),
             magic=False,
         )
-        results: List[CrawlResult] = await crawler.arun(url=nss_url, config=config)
+        results: List[CrawlResult] = await cache.arun(crawler, nss_url, config)
         for result in results:
             if result.success:
                 try:
@@ -234,18 +301,15 @@ async def namibia():
                             "title": title,
                             "link": link,
                         }
-                        home_docs.append(report)
+                        home_docs.write(report)
 
-                print(f"After filtering: {len(home_docs)} items with both title and link")
+                print(f"After filtering: {home_docs.count} items with both title and link")
 
-    with open("home_page_docs.json", "w", encoding="utf-8") as f:
-        json.dump(home_docs, f, ensure_ascii=False, indent=4)
+        await save_section(home_docs, "home_page_docs.json")
 
-    print(f"Saved {len(home_docs)} valid documents to home_docs.json")
+        print(f"Saved {home_docs.count} valid documents to home_docs.json")
 
-# ----------------------- DOCUMENTS EXTRACTION -----------------------
-
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
+        # ----------------------- DOCUMENTS EXTRACTION -----------------------
 
         # Extract the DOCUMENTS URL
         documents_url = None
@@ -253,19 +317,19 @@ async def namibia():
             if "DOCUMENTS" in item:
                 documents_url = item["DOCUMENTS"]
                 break
-            
+
         config=CrawlerRunConfig (
                     cache_mode=CacheMode.BYPASS,
                     scan_full_page=True,
                     wait_for="tbody tr.post-row",  # Wait until banner is gone
                     wait_for_timeout=60000, # 60 seconds
-                    session_id="hn_session",
+                    session_id="nss_session",
                     extraction_strategy=JsonCssExtractionStrategy(schema = nss_nsdi_docs_schema),
                     magic=False, 
                     page_timeout= 60000, # 60 seconds 
-    )
-        
-        results: List[CrawlResult] = await crawler.arun(url=documents_url, config=config)
+        )
+
+        results: List[CrawlResult] = await cache.arun(crawler, documents_url, config)
         for result in results:
             if result.success:
                 try:
@@ -282,25 +346,25 @@ async def namibia():
                         "date": item.get("date", "").strip(),
                         "link": item.get("link", "").strip(),
                     }
-                    nss_docs.append(report)
-
-    with open("nss_docs.json", "w", encoding="utf-8") as f:
-        json.dump(nss_docs, f, ensure_ascii=False, indent=4)
+                    nss_docs.write(report)
 
+        await save_section(nss_docs, "nss_docs.json")
 
+        await crawler.crawler_strategy.kill_session("nss_session")
 
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
+    async def extract_nsdi(crawler):
+        """NSDI: navigation menu and DOCUMENTS page"""
 
         config=CrawlerRunConfig (
             cache_mode=CacheMode.BYPASS,
             scan_full_page=True,
             wait_for="body section",   
-            session_id="hn_session",
+            session_id="nsdi_session",
             extraction_strategy=JsonCssExtractionStrategy(schema=nss_nsdi_nav_schema),
             magic=False, 
         )
 
-        results: List[CrawlResult] = await crawler.arun(url=nsdi_url,config=config,)
+        results: List[CrawlResult] = await cache.arun(crawler, nsdi_url, config)
 
         for result in results:
             if result.success and result.extracted_content:
@@ -328,16 +392,14 @@ async def namibia():
 
         print(f"After deduplication: {len(nsdi_nav_links)} unique menu links")
 
-    # Save the unique results   
-    with open("nsdi_menu_links.json", "w", encoding="utf-8") as f:
-        json.dump(nsdi_nav_links, f, indent=4)
+        # Save the unique results   
+        with open("nsdi_menu_links.json", "w", encoding="utf-8") as f:
+            json.dump(nsdi_nav_links, f, indent=4)
 
-    print(f"Saved {len(nsdi_nav_links)} unique menu links to nsdi_menu_links.json")
+        print(f"Saved {len(nsdi_nav_links)} unique menu links to nsdi_menu_links.json")
 
-# ----------------------- DOCUMENTS EXTRACTION -----------------------
+        # ----------------------- DOCUMENTS EXTRACTION -----------------------
 
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
-        
         # Extract the DOCUMENTS URL
         documents_url = None
         for item in nsdi_nav_links:
@@ -350,13 +412,13 @@ async def namibia():
                     scan_full_page=True,
                     wait_for="tbody tr.post-row",  # Wait until banner is gone
                     wait_for_timeout=60000, # 60 seconds
-                    session_id="hn_session",
+                    session_id="nsdi_session",
                     extraction_strategy=JsonCssExtractionStrategy(schema = nss_nsdi_docs_schema),
                     magic=False, 
                     page_timeout= 60000, # 60 seconds 
-    )
-        
-        results: List[CrawlResult] = await crawler.arun(url=documents_url, config=config)
+        )
+
+        results: List[CrawlResult] = await cache.arun(crawler, documents_url, config)
         for result in results:
             if result.success:
                 try:
@@ -373,53 +435,51 @@ async def namibia():
                         "date": item.get("date", "").strip(),
                         "link": item.get("link", "").strip(),
                     }
-                    nsdi_docs.append(report)
+                    nsdi_docs.write(report)
 
-    with open("nsdi_docs.json", "w", encoding="utf-8") as f:
-        json.dump(nsdi_docs, f, ensure_ascii=False, indent=4)
+        await save_section(nsdi_docs, "nsdi_docs.json")
 
+        await crawler.crawler_strategy.kill_session("nsdi_session")
 
-# ------------------------- Publication Menu Links Extract  ------------------------- #
+    async def extract_publications(crawler):
+        """Main menu links, publication folders and publications per folder"""
 
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
+        # ------------------------- Publication Menu Links Extract  ------------------------- #
 
         config=CrawlerRunConfig (
             cache_mode=CacheMode.BYPASS,
             scan_full_page=True,
             wait_for="body section",   
-            session_id="hn_session",
+            session_id="pub_session",
             extraction_strategy=JsonCssExtractionStrategy(schema = menu_links_schema),
             magic=False, 
         )
-        
-        results: List[CrawlResult] = await crawler.arun(url=base_url,config=config,)
-        
+
+        results: List[CrawlResult] = await cache.arun(crawler, base_url, config)
+
         for result in results:
             if result.success:
                 items = json.loads(result.extracted_content)
                 print(f"Extracted {len(items)} Links")
                 for item in items:
-                    menu_url = ensure_base_url(item.get("url", ""))
+                    menu_url = ensure_base_url(item.get("url", ""), base_url)
                     if menu_url != base_url + "#":
                         menu_links.add(menu_url)  # Add URL to the set
 
-    with open("nsa_menu_links.json", "w", encoding="utf-8") as f:
-        json.dump(list(menu_links), f, indent=4)
+        with open("nsa_menu_links.json", "w", encoding="utf-8") as f:
+            json.dump(list(menu_links), f, indent=4)
 
-
-# ------------------------- Publications Folders Extraction ------------------------- #
-    
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False)) as crawler:
+        # ------------------------- Publications Folders Extraction ------------------------- #
 
         config = CrawlerRunConfig(
             cache_mode=CacheMode.BYPASS,
             scan_full_page=True,
             wait_for=".dlp-folder",  
-            session_id="nsa_session",
+            session_id="pub_session",
             extraction_strategy=JsonCssExtractionStrategy(schema=pub_folder_schema),
         )
 
-        results = await crawler.arun(url=pub_url, config=config)
+        results = await cache.arun(crawler, pub_url, config)
 
         folder_dict = {}  
 
@@ -440,97 +500,142 @@ async def namibia():
             with open("folders.json", "w", encoding="utf-8") as f:
                 json.dump(folder_dict, f, indent=2, ensure_ascii=False)
 
-# ------------------------- Extract Publications by Folder ------------------------- #  
-           
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False, verbose=True)) as crawler:
+        # ------------------------- Extract Publications by Folder ------------------------- #
 
         with open("folders.json", "r", encoding="utf-8") as f:
             id_name_dict = json.load(f)
 
         id_name_dict = {k: v for k, v in id_name_dict.items() if v} # Remove empty names
 
-        for category_id in id_name_dict.keys():
-
+        if PUB_FOLDERS_SINGLE_PASS:
+            # One page load: open every folder, then extract all tables in a single pass
             config = CrawlerRunConfig(
                 cache_mode=CacheMode.BYPASS,
                 scan_full_page=True,
-                wait_for=".dlp-category-table tbody tr",  
-                session_id="hn_session",
-                extraction_strategy=JsonCssExtractionStrategy(schema=pub_docs_schema),
+                wait_for="js:() => window.__nsaFoldersLoaded === true",
+                wait_for_timeout=PUB_FOLDER_TIMEOUT_MS * max(1, len(id_name_dict)),
+                session_id="pub_session",
+                extraction_strategy=JsonCssExtractionStrategy(schema=pub_rows_schema),
                 magic=False,
-                js_code=f"""
-                    function openFolderAndWait(categoryId, callback) {{
-                        const folder = document.querySelector(`li.dlp-folder[data-category-id="${{categoryId}}"]`);
-                        if (!folder) {{
-                            console.log(`❌ Folder ${{categoryId}} not found`);
-                            return;
-                        }}
-                        const clickable = folder.querySelector(".dlp-icon.folder, .dlp-category-name");
-                        if (!clickable) {{
-                            console.log("⚠️ No clickable element found inside folder.");
-                            return;
-                        }}
-                        console.log("🖱️ Clicking folder:", categoryId);
-                        clickable.click();
-                        const observer = new MutationObserver((mutations, obs) => {{
-                            if (folder.classList.contains("table-loaded")) {{
-                                obs.disconnect();
-                                const table = folder.querySelector(".dlp-category-table");
-                                if (table) {{
-                                    console.log("✅ Table loaded for category:", categoryId);
-                                    callback(table);
-                                }}
-                            }}
-                        }});
-
-                        observer.observe(folder, {{ attributes: true, attributeFilter: ["class"] }});
-                    }}
-                    openFolderAndWait("{category_id}", (table) => {{
-                        console.log("📄 Table HTML for category {category_id}:", table.innerHTML);
-                    }});
-                """,
+                js_code=open_all_folders_js,
                 page_timeout=60000,
             )
 
-            results: List[CrawlResult] = await crawler.arun(url=pub_url, config=config)
+            results: List[CrawlResult] = await cache.arun(crawler, pub_url, config)
 
+            folder_rows: Dict[str, list] = {category_id: [] for category_id in id_name_dict}
             for result in results:
                 if result.success:
                     try:
                         items = json.loads(result.extracted_content)
                     except Exception as e:
-                        print(f"⚠️ Could not parse JSON for category {category_id}: {e}")
+                        print(f"⚠️ Could not parse JSON for publication folders: {e}")
                         items = []
 
-                    print(f"Extracted {len(items)} items for category ID {category_id}")
-
                     for item in items:
-                        report = {
-                            "title": item.get("title", "").strip(),
-                            "categories": item.get("categories", "").strip(),
-                            "date": item.get("date", "").strip(),
-                            "link": item.get("link", "").strip(),
-                            "category_id": category_id,
-                        }
-                        pub_docs.append(report)
+                        category_id = item.get("category_id", "")
+                        if category_id in folder_rows:
+                            folder_rows[category_id].append({
+                                "title": item.get("title", "").strip(),
+                                "categories": item.get("categories", "").strip(),
+                                "date": item.get("date", "").strip(),
+                                "link": item.get("link", "").strip(),
+                                "category_id": category_id,
+                            })
+                else:
+                    print(f"❌ Crawl failed: {result.error_message}")
+
+            # Keep the folder-by-folder ordering of the per-folder mode
+            for category_id, rows in folder_rows.items():
+                print(f"Extracted {len(rows)} items for category ID {category_id}")
+                pub_docs.write_many(rows)
+
+        else:
+            # Per-folder mode: one page load per category
+            for category_id in id_name_dict.keys():
+
+                config = CrawlerRunConfig(
+                    cache_mode=CacheMode.BYPASS,
+                    scan_full_page=True,
+                    wait_for=".dlp-category-table tbody tr",  
+                    session_id="pub_session",
+                    extraction_strategy=JsonCssExtractionStrategy(schema=pub_docs_schema),
+                    magic=False,
+                    js_code=f"""
+                        function openFolderAndWait(categoryId, callback) {{
+                            const folder = document.querySelector(`li.dlp-folder[data-category-id="${{categoryId}}"]`);
+                            if (!folder) {{
+                                console.log(`❌ Folder ${{categoryId}} not found`);
+                                return;
+                            }}
+                            const clickable = folder.querySelector(".dlp-icon.folder, .dlp-category-name");
+                            if (!clickable) {{
+                                console.log("⚠️ No clickable element found inside folder.");
+                                return;
+                            }}
+                            console.log("🖱️ Clicking folder:", categoryId);
+                            clickable.click();
+                            const observer = new MutationObserver((mutations, obs) => {{
+                                if (folder.classList.contains("table-loaded")) {{
+                                    obs.disconnect();
+                                    const table = folder.querySelector(".dlp-category-table");
+                                    if (table) {{
+                                        console.log("✅ Table loaded for category:", categoryId);
+                                        callback(table);
+                                    }}
+                                }}
+                            }});
+
+                            observer.observe(folder, {{ attributes: true, attributeFilter: ["class"] }});
+                        }}
+                        openFolderAndWait("{category_id}", (table) => {{
+                            console.log("📄 Table HTML for category {category_id}:", table.innerHTML);
+                        }});
+                    """,
+                    page_timeout=60000,
+                )
+
+                results: List[CrawlResult] = await cache.arun(crawler, pub_url, config)
+
+                for result in results:
+                    if result.success:
+                        try:
+                            items = json.loads(result.extracted_content)
+                        except Exception as e:
+                            print(f"⚠️ Could not parse JSON for category {category_id}: {e}")
+                            items = []
 
-    with open("pub_docs.json", "w", encoding="utf-8") as f:
-        json.dump(pub_docs, f, ensure_ascii=False, indent=4)
+                        print(f"Extracted {len(items)} items for category ID {category_id}")
 
-# ------------------------- Census Page Extraction ------------------------- #
+                        for item in items:
+                            report = {
+                                "title": item.get("title", "").strip(),
+                                "categories": item.get("categories", "").strip(),
+                                "date": item.get("date", "").strip(),
+                                "link": item.get("link", "").strip(),
+                                "category_id": category_id,
+                            }
+                            pub_docs.write(report)
+
+        await save_section(pub_docs, "pub_docs.json")
+
+        await crawler.crawler_strategy.kill_session("pub_session")
+
+    async def extract_census(crawler):
+        """Census 2023 products page"""
+
+        # ------------------------- Census Page Extraction ------------------------- #
 
-    async with AsyncWebCrawler(config=BrowserConfig(headless=False, verbose=True)) as crawler:
-        
         config0 = CrawlerRunConfig(
             cache_mode=CacheMode.BYPASS,
             scan_full_page=True,
             wait_for="li.menu-item-10792 a[target='_blank']",  
-            session_id="hn_session",
+            session_id="census_session",
             extraction_strategy=JsonCssExtractionStrategy(schema=census_main_report_schema),
             magic=False,
             page_timeout=60000,
         )
-        results: List[CrawlResult] = await crawler.arun(url=census_url, config=config0)
+        results: List[CrawlResult] = await cache.arun(crawler, census_url, config0, fetch=lambda u, c: static.arun(crawler, u, c))
 
         main_links = []
         for result in results:
@@ -545,7 +650,7 @@ async def namibia():
                         file_name = os.path.basename(link)
                         file_name_no_ext = os.path.splitext(file_name)[0]
                         clean_title = file_name_no_ext.replace('-', ' ')
-                        census_docs.append({
+                        census_docs.write({
                             "main_title": "Census 2023 Products",  # Will propagate to all reports
                             "title": clean_title,
                             "link": link
@@ -554,19 +659,18 @@ async def namibia():
             else:
                 print(f"❌ Crawl failed: {result.error_message}")
 
-
         config1 = CrawlerRunConfig(
             cache_mode=CacheMode.BYPASS,
             scan_full_page=True,
             wait_for=".e-con-inner", 
-            session_id="hn_session",
+            session_id="census_session",
             extraction_strategy=JsonCssExtractionStrategy(schema=census_docs_schema),
             magic=False,
             page_timeout=60000,
         )
 
-        results: List[CrawlResult] = await crawler.arun(url=census_url, config=config1)
-        
+        results: List[CrawlResult] = await cache.arun(crawler, census_url, config1, fetch=lambda u, c: static.arun(crawler, u, c))
+
         for result in results:
             if result.success:
                 try:
@@ -585,72 +689,71 @@ async def namibia():
                             "title": item.get("title", "").strip(),
                             "link": item.get("link", "").strip(),
                         }
-                        census_docs.append(report)
+                        census_docs.write(report)
                         print(f"📄 Found: {report['title']} -> {report['link']}")
             else:
                 print(f"❌ Crawl failed: {result.error_message}")
 
-    # Save results
-    with open("census_docs.json", "w", encoding="utf-8") as f:
-        json.dump(census_docs, f, ensure_ascii=False, indent=4)
+        # Save results
+        await save_section(census_docs, "census_docs.json")
 
-    print(f"💾 Saved {len(census_docs)} files to census_docs.json")
+        print(f"💾 Saved {census_docs.count} files to census_docs.json")
 
-#  ----------------------- MERGE AND SAVE ALL DOCUMENTS ----------------------
+        await crawler.crawler_strategy.kill_session("census_session")
 
-    nsa_data = nss_docs + home_docs + nsdi_docs + census_docs + pub_docs
-    print(f"Total documents collected: {len(nsa_data)}")
-    # Save merged results
-    with open("nsa_data.json", "w", encoding="utf-8") as f:
-        json.dump(nsa_data, f, ensure_ascii=False, indent=4)
+# ------------------------- RUN ALL SECTIONS ON ONE BROWSER ------------------------- #
+
+    # NSS, NSDI, publications and census don't depend on each other, so they run concurrently,
+    # each on its own page (session) of a single shared browser, at most BROWSER_PAGES at a time.
+    pages = asyncio.Semaphore(max(1, BROWSER_PAGES))
 
-    print(f"Saved {len(nsa_data)} merged documents to nsa_data.json")
+    async def on_page(section, crawler):
+        async with pages:
+            return await section(crawler)
 
-    # Load the JSON data from file
-    with open('nsa_data.json', 'r', encoding='utf-8') as file:
-        data = json.load(file)
+    async with downloads, AsyncWebCrawler(config=BrowserConfig(headless=headless, verbose=True)) as crawler, static:
+        sections = [extract_nss, extract_nsdi, extract_publications, extract_census]
+        outcomes = await asyncio.gather(*(on_page(section, crawler) for section in sections), return_exceptions=True)
+        for section, outcome in zip(sections, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"❌ {section.__name__} failed: {outcome}")
+        for docs in (nss_docs, home_docs, nsdi_docs, census_docs, pub_docs):
+            docs.close()  # flush whatever a failed section got through
+            await queue_downloads(docs)  # already-queued links are skipped by the pipeline
 
-    # Extract all unique links
+    print(f"Page cache: {cache.hits} hits, {cache.misses} misses")
+    cache.close()
+
+#  ----------------------- MERGE AND SAVE ALL DOCUMENTS ----------------------
+
+    # Sections are merged in their original order by re-reading their NDJSON streams,
+    # collecting the unique links on the way through
     links = []
     seen_links = set()
 
-    for item in data:
-        link = item.get("link")
-        if link and link not in seen_links:
-            links.append(link)
-            seen_links.add(link)
+    def merged_docs():
+        for docs in (nss_docs, home_docs, nsdi_docs, census_docs, pub_docs):
+            for item in read_ndjson(docs.path):
+                link = item.get("link")
+                if link and link not in seen_links:
+                    links.append(link)
+                    seen_links.add(link)
+                yield item
 
-    # Create a text file with all the links
-    file_content = "\n".join(links)
+    # Save merged results
+    total_docs = write_json_array(merged_docs(), "nsa_data.json")
+    print(f"Saved {total_docs} merged documents to nsa_data.json")
 
     # Save to a text file
     with open("nsa_all_links.txt", "w", encoding='utf-8') as file:
-        file.write(file_content)
+        file.write("\n".join(links))
 
     print(f"Links have been saved to 'nsa_all_links.txt'")
     print(f"Total unique links extracted: {len(links)}")
-    print(f"Total documents in JSON: {len(data)}")
-
-    # ------------------------- Download files into a folder ---------------- #
-
-    download_folder = 'file_downloads'
-    os.makedirs(download_folder, exist_ok=True)
-
-    with open('nsa_all_links.txt', 'r', encoding='utf-8') as f:
-        urls = [line.strip() for line in f if line.strip()]
-
-    failed = []
 
-    for url in urls:
-        filename = os.path.join(download_folder, url.split('/')[-1])
-        try:
-            response = requests.get(url, timeout=60, verify=False)
-            response.raise_for_status()
-            with open(filename, 'wb') as f_out:
-                f_out.write(response.content)
+    # ------------------------- Downloads (already finished by the pipeline) ---------------- #
 
-        except Exception as e:
-            failed.append(url)
+    failed = downloads.failed
 
     # Save failed URLs for retry
     if failed:
@@ -0,0 +1 @@
+"""Shared helpers used by the country NSO scrapers"""
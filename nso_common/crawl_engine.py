@@ -0,0 +1,138 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from crawl4ai import JsonCssExtractionStrategy
+
+from nso_common.urls import canonicalize
+
+# A step says how to read one kind of page:
+#   {
+#       "schema": {...},                 # JSON CSS schema run on the page
+#       "follow": ["next_step", ...],    # steps to apply to each extracted item's URL
+#       "documents": True,               # extracted URLs are documents, not pages to follow
+#       "skip_titles": {"accueil"},      # items with these (lowercased) titles are ignored
+#       "label": "SUBMENU",              # tag used in log lines
+#       ...                              # anything else is passed through to fetch()
+#   }
+Step = Dict[str, Any]
+Fetch = Callable[[str, Step], Awaitable[Optional[str]]]  # (url, step) -> page HTML, None if it failed
+# fetch is called again for a page a later level needs; it should serve that from its page cache
+OnDocuments = Callable[[List[dict]], Awaitable[None]]  # called with the documents found in each level
+
+
+class LevelCrawler:
+    """Breadth-first crawl of a page tree, one level at a time
+
+    Every (step, url) pair of a level is a work item. URLs are canonicalized,
+    and all steps that need the same page in a level share a single fetch: the
+    page is loaded once and every step's schema runs on that HTML, which is
+    then dropped, so memory is bounded by `concurrency` pages, not the crawl.
+    A page needed again in a deeper level is asked of fetch again (its page
+    cache serves it); a page that failed is not retried. A (step, url) pair is
+    only processed once however many branches lead to it, and every document
+    found is returned in one flat list with the path that led to it.
+    """
+
+    def __init__(
+        self,
+        steps: Dict[str, Step],
+        fetch: Fetch,
+        concurrency: int = 8,
+        log: Callable[[str], None] = print,
+        on_documents: Optional[OnDocuments] = None,
+    ):
+        self.steps = steps
+        self.fetch = fetch
+        self.on_documents = on_documents
+        self.concurrency = concurrency
+        self.log = log
+        self.visited: Set[Tuple[str, str]] = set()
+        self.loaded: Dict[str, bool] = {}  # url -> whether its first load succeeded
+        self.failed: List[Tuple[str, str]] = []
+        self.pages_fetched = 0  # distinct pages loaded; re-reads for a later level are not counted
+
+    async def run(self, start_step: str, start_urls: List[str]) -> List[dict]:
+        level = [(start_step, canonicalize(url), []) for url in start_urls]
+        documents: List[dict] = []
+        depth = 0
+        while level:
+            found_before = len(documents)
+            pages = self._group_by_page(level)
+            to_load = {url: tasks for url, tasks in pages.items() if self.loaded.get(url, True)}
+            self.log(f"[LEVEL {depth}] {len(pages)} pages ({sum(url in self.loaded for url in pages)} seen before)")
+            extracted = dict(zip(to_load, await self._load_level(to_load)))
+            next_level = []
+            for url, tasks in pages.items():
+                items_per_step = extracted.get(url)
+                for (step_name, path), items in zip(tasks, items_per_step or [None] * len(tasks)):
+                    if items is None:
+                        self.failed.append((step_name, url))
+                        self.log(f"[ERROR] Failed to extract {step_name} items for {url}")
+                        continue
+                    next_level.extend(self._expand(step_name, url, path, items, documents))
+            if self.on_documents and len(documents) > found_before:
+                await self.on_documents(documents[found_before:])
+            level = next_level
+            depth += 1
+        return documents
+
+    def _group_by_page(self, level) -> Dict[str, List[tuple]]:
+        """{url: [(step, path), ...]} for the not-yet-visited work items of a level"""
+        pages: Dict[str, List[tuple]] = {}
+        for step_name, url, path in level:
+            if (step_name, url) in self.visited:
+                continue
+            self.visited.add((step_name, url))
+            pages.setdefault(url, []).append((step_name, path))
+        return pages
+
+    async def _load_level(self, pages) -> List[Optional[List[list]]]:
+        """Each page's items for each of its steps (None if it failed); the HTML is dropped once extracted"""
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def load_one(url, tasks):
+            async with limit:
+                if url not in self.loaded:
+                    self.pages_fetched += 1
+                try:
+                    html = await self.fetch(url, self.steps[tasks[0][0]])
+                except Exception as e:
+                    self.log(f"[ERROR] {url}: {e}")
+                    html = None
+                self.loaded.setdefault(url, html is not None)
+                if html is None:
+                    return None
+                return [
+                    JsonCssExtractionStrategy(schema=self.steps[step_name]["schema"]).run(url, [html])
+                    for step_name, _ in tasks
+                ]
+
+        return await asyncio.gather(*(load_one(url, tasks) for url, tasks in pages.items()))
+
+    def _expand(self, step_name, url, path, items, documents) -> list:
+        """Turn one page's items into documents or next-level work items"""
+        step = self.steps[step_name]
+        skip_titles = step.get("skip_titles", set())
+        indent = "  " * len(path)
+        tasks = []
+        for item in items:
+            item_url = item.get("url")
+            if not item_url:
+                continue
+            title = (item.get("title") or "").strip()
+            if title.lower() in skip_titles:
+                continue
+            try:
+                item_url = canonicalize(item_url, url)
+            except ValueError as e:  # e.g. a malformed port
+                self.log(f"{indent}[SKIP] bad link {item_url!r} on {url}: {e}")
+                continue
+            if step.get("documents"):
+                self.log(f"{indent}[DOCUMENT LINK] - {item_url}")
+                documents.append({"url": item_url, "page": url, "step": step_name, "path": path})
+                continue
+            self.log(f"{indent}[{step.get('label', step_name.upper())}] {title}: {item_url}")
+            child_path = path + [{"title": title, "url": item_url}]
+            for next_step in step.get("follow", []):
+                tasks.append((next_step, item_url, child_path))
+        return tasks
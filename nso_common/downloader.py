@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from nso_common.file_store import STORE_DIR, FileStore
+from nso_common.manifest import DownloadManifest
+from nso_common.throttle import Bandwidth
+
+CHUNK_SIZE = 1024 * 1024  # stream bodies to disk 1 MiB at a time
+MANIFEST_NAME = "download_manifest.sqlite"
+
+# Defaults for this process (run_all.py sets them to split its global budget between countries)
+DOWNLOAD_KBPS = float(os.environ.get("NSO_DOWNLOAD_KBPS", "0"))  # total download rate, 0 = unlimited
+DOWNLOAD_KBPS_FILE = os.environ.get("NSO_DOWNLOAD_KBPS_FILE")  # file holding the rate, re-read while running (overrides NSO_DOWNLOAD_KBPS)
+DOWNLOAD_PER_HOST = int(os.environ.get("NSO_DOWNLOAD_PER_HOST", "4"))  # parallel downloads from one host
+
+
+def partial_path(download_folder, url):
+    """Temp file for an in-flight download (keyed by URL so shared basenames never clash)"""
+    return os.path.join(download_folder, ".partial", hashlib.sha1(url.encode("utf-8")).hexdigest() + ".part")
+
+
+def file_sha256(path, digest=None):
+    """Hash a file on disk in chunks, optionally continuing an existing digest"""
+    digest = digest or hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+
+def target_path(download_folder, url, sha256, manifest=None):
+    """Where a URL's file goes: its basename, unless a different file from another URL already has it"""
+    entry = manifest.get(url) if manifest else None
+    if entry:
+        return entry["path"]  # keep the name this URL was given before
+    name = os.path.basename(urlparse(url).path) or hashlib.sha1(url.encode("utf-8")).hexdigest()
+    path = os.path.join(download_folder, name)
+    owner = manifest.owner(path, url) if manifest else None
+    if owner and owner["sha256"] != sha256:
+        stem, ext = os.path.splitext(name)
+        path = os.path.join(download_folder, f"{stem}-{sha256[:8]}{ext}")
+    return path
+
+
+async def download_file(
+    session: aiohttp.ClientSession,
+    url: str,
+    download_folder: str,
+    manifest: Optional[DownloadManifest] = None,
+    store: Optional[FileStore] = None,
+    bandwidth: Optional[Bandwidth] = None,
+) -> str:
+    """Stream one URL into download_folder; returns "downloaded", "resumed" or "unchanged"
+
+    Unchanged files are skipped with If-None-Match / If-Modified-Since, and a
+    .part file left by an interrupted run is continued with a Range request.
+    With a store, the content is kept once in it and hardlinked into download_folder.
+    """
+    temp_file = partial_path(download_folder, url)
+    validator_file = temp_file + ".json"  # validators of the response the .part file came from
+    os.makedirs(os.path.dirname(temp_file), exist_ok=True)
+
+    headers = {}
+    resume_from = 0
+    validators = {}
+    if os.path.exists(temp_file) and os.path.exists(validator_file):
+        with open(validator_file, "r", encoding="utf-8") as f:
+            validators = json.load(f)
+        if validators.get("etag") or validators.get("last_modified"):
+            resume_from = os.path.getsize(temp_file)
+    if resume_from:
+        headers["Range"] = f"bytes={resume_from}-"
+        headers["If-Range"] = validators.get("etag") or validators["last_modified"]
+    else:
+        entry = manifest.get(url) if manifest else None
+        if entry and os.path.exists(entry["path"]):
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+    async with session.get(url, headers=headers) as response:
+        if response.status == 304:
+            return "unchanged"
+        content_range = response.headers.get("Content-Range", "")
+        if resume_from and response.status == 416:
+            if content_range == f"bytes */{resume_from}":
+                # The .part is already whole: the last run stopped between its final write and the rename
+                return finish_download(url, download_folder, temp_file, validators, file_sha256(temp_file), manifest, store, "resumed")
+            discard_partial(temp_file)  # can't be continued: start over
+            return await download_file(session, url, download_folder, manifest, store, bandwidth)
+        response.raise_for_status()
+
+        resumed = response.status == 206 and bool(resume_from) and content_range.startswith(f"bytes {resume_from}-")
+        if response.status == 206 and not resumed:
+            # Some other slice of the file: appending it (or saving it as the whole file) would corrupt it
+            discard_partial(temp_file)
+            if resume_from:
+                return await download_file(session, url, download_folder, manifest, store, bandwidth)
+            raise ValueError(f"unexpected partial response ({content_range or 'no Content-Range'})")
+        if resumed:
+            digest = file_sha256(temp_file)
+            mode = "ab"
+        else:
+            digest = hashlib.sha256()
+            mode = "wb"
+            validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+            with open(validator_file, "w", encoding="utf-8") as f:
+                json.dump(validators, f)
+
+        with open(temp_file, mode) as f_out:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                f_out.write(chunk)
+                digest.update(chunk)
+                if bandwidth:
+                    await bandwidth.consume(len(chunk))
+
+    return finish_download(url, download_folder, temp_file, validators, digest, manifest, store, "resumed" if resumed else "downloaded")
+
+
+def discard_partial(temp_file):
+    """Drop a .part file and its validators, so the URL downloads from scratch"""
+    for path in (temp_file, temp_file + ".json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def finish_download(url, download_folder, temp_file, validators, digest, manifest, store, status):
+    """Move a complete .part file into place and record it; returns status"""
+    size = os.path.getsize(temp_file)
+    sha256 = digest.hexdigest()
+    filename = target_path(download_folder, url, sha256, manifest)
+    if store:
+        store.add(temp_file, sha256, url, os.path.basename(filename))
+        store.link(sha256, filename)
+    else:
+        os.replace(temp_file, filename)  # atomic: readers never see a half-written file
+    os.remove(temp_file + ".json")
+    if manifest:
+        manifest.record(url, filename, validators.get("etag"), validators.get("last_modified"), size, sha256)
+    return status
+
+
+class DownloadPipeline:
+    """Download workers fed through a bounded queue, so files download while the crawl is still running
+
+    put() blocks once queue_size URLs are waiting, which slows the producer down to
+    the download rate instead of buffering without limit. Leaving the context (or
+    close()) waits for the queue to drain; failed then lists the URLs that failed,
+    in the order they were put. Leaving it with an exception aborts instead.
+    """
+
+    def __init__(
+        self,
+        download_folder: str,
+        concurrency: int = 8,
+        per_host: int = DOWNLOAD_PER_HOST,
+        timeout: int = 60,
+        queue_size: int = 256,
+        log: Optional[Callable] = None,
+        store_root: Optional[str] = STORE_DIR,
+        max_kbps: float = DOWNLOAD_KBPS,
+        kbps_file: Optional[str] = DOWNLOAD_KBPS_FILE,
+    ):
+        self.download_folder = download_folder
+        self.store_root = store_root  # None saves plain files without the content-addressed store
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.log = log
+        self.failed: List[str] = []
+        self._bandwidth = Bandwidth(max_kbps * 1024, rate_file=kbps_file) if max_kbps > 0 or kbps_file else None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._seen: Dict[str, int] = {}  # url -> position it was put at
+        self._failed_at: Dict[int, str] = {}
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._workers: List[asyncio.Task] = []
+        self._session = None
+        self._manifest = None
+        self._store = None
+
+    async def __aenter__(self):
+        os.makedirs(self.download_folder, exist_ok=True)
+        self._manifest = DownloadManifest(os.path.join(self.download_folder, MANIFEST_NAME))
+        self._store = FileStore(self.store_root) if self.store_root else None
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host, ssl=False)
+        client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=client_timeout)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        return self
+
+    async def __aexit__(self, *exc):
+        if exc[0] is not None:
+            await self.abort()  # failing or cancelled: don't download the whole backlog first
+        else:
+            await self.close()
+
+    async def put(self, url: str):
+        """Queue url for download (once per pipeline), waiting while the queue is full"""
+        if not url or url in self._seen:
+            return
+        self._seen[url] = len(self._seen)
+        await self._queue.put(url)
+
+    async def close(self) -> List[str]:
+        """Let the workers finish everything queued, then release the session"""
+        if self._session is None:
+            return self.failed
+        for _ in self._workers:
+            await self._queue.put(None)
+        try:
+            await asyncio.gather(*self._workers)
+        finally:
+            await self._release()
+        self.failed = [self._failed_at[index] for index in sorted(self._failed_at)]
+        return self.failed
+
+    async def abort(self):
+        """Stop the workers without draining the queue; in-flight files stay as .part files for the next run to resume"""
+        if self._session is None:
+            return
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await self._release()
+
+    async def _release(self):
+        await self._session.close()
+        self._manifest.close()
+        if self._store:
+            self._store.close()
+        self._session = None
+
+    async def _worker(self):
+        while True:
+            url = await self._queue.get()
+            if url is None:
+                return
+            host_limit = self._host_limits.setdefault(urlparse(url).netloc.lower(), asyncio.Semaphore(self.per_host))
+            async with host_limit:
+                try:
+                    status = await download_file(self._session, url, self.download_folder, self._manifest, self._store, self._bandwidth)
+                except Exception as e:
+                    self._failed_at[self._seen[url]] = url
+                    if self.log:
+                        self.log(f"[ERROR] Failed to download {url}: {e}", "error")
+                    continue
+            if not self.log:
+                continue
+            if status == "unchanged":
+                self.log(f"[SKIP].... ● unchanged {url}", "info")
+            else:
+                self.log(f"[DOWNLOAD] ✓ {url} ({status})", "success")
+
+
+async def download_files(
+    urls: Iterable[str],
+    download_folder: str,
+    concurrency: int = 8,
+    per_host: int = DOWNLOAD_PER_HOST,
+    timeout: int = 60,
+    log: Optional[Callable] = None,
+) -> List[str]:
+    """Download urls concurrently over one pooled session; returns the URLs that failed"""
+    async with DownloadPipeline(download_folder, concurrency, per_host, timeout, log=log) as pipeline:
+        for url in urls:
+            await pipeline.put(url)
+    return pipeline.failed
@@ -0,0 +1,90 @@
+import os
+import shutil
+import sqlite3
+import time
+from typing import Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Shared by every country's downloader, so a file published by several NSOs is kept once
+STORE_DIR = os.environ.get("NSO_FILE_STORE", os.path.join(REPO_ROOT, ".file_store"))
+
+
+class FileStore:
+    """Content-addressed store for downloaded files, keyed by SHA-256
+
+    Each distinct file is kept once under objects/<sha[:2]>/<sha>; the
+    download folders only hold hardlinks to it (a copy where the filesystem
+    can't link). The index maps every URL to its hash and original filename.
+    """
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                filename TEXT,
+                size INTEGER,
+                updated_at REAL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)")
+        self.conn.commit()
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "objects", sha256[:2], sha256)
+
+    def add(self, temp_path: str, sha256: str, url: str, filename: str) -> str:
+        """Move a finished download into the store (dropping it if the content is already there)"""
+        target = self.object_path(sha256)
+        size = os.path.getsize(temp_path)
+        if os.path.exists(target):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.replace(temp_path, target)
+            except OSError:  # store on another filesystem
+                shutil.copy2(temp_path, target + ".tmp")
+                os.replace(target + ".tmp", target)
+                os.remove(temp_path)
+        self.conn.execute(
+            """
+            INSERT INTO files (url, sha256, filename, size, updated_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                sha256 = excluded.sha256,
+                filename = excluded.filename,
+                size = excluded.size,
+                updated_at = excluded.updated_at
+            """,
+            (url, sha256, filename, size, time.time()),
+        )
+        self.conn.commit()
+        return target
+
+    def link(self, sha256: str, dest: str):
+        """Make dest point at the stored object, replacing whatever was there"""
+        source = self.object_path(sha256)
+        if os.path.exists(dest) and os.path.samefile(source, dest):
+            return
+        temp_dest = dest + ".link"
+        if os.path.exists(temp_dest):
+            os.remove(temp_dest)
+        try:
+            os.link(source, temp_dest)
+        except OSError:
+            shutil.copy2(source, temp_dest)  # other filesystem, or no hardlink support
+        os.replace(temp_dest, dest)
+
+    def lookup(self, url: str) -> Optional[dict]:
+        row = self.conn.execute("SELECT * FROM files WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def close(self):
+        self.conn.close()
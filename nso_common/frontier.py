@@ -0,0 +1,103 @@
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class CrawlFrontier:
+    """SQLite-backed record of every URL a crawl stage has to visit and what it yielded
+
+    Each (stage, url) row is pending until its result is stored with complete(),
+    so a restarted crawl can skip pages it already fetched and pick up the rest.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS frontier (
+                stage TEXT NOT NULL,
+                url TEXT NOT NULL,
+                parent TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                result TEXT,
+                error TEXT,
+                updated_at REAL,
+                PRIMARY KEY (stage, url)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def add(self, stage: str, urls: Iterable[str], parent: Optional[str] = None):
+        """Queue urls for a stage; URLs already known to the stage keep their status"""
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO frontier (stage, url, parent, updated_at) VALUES (?, ?, ?, ?)",
+            [(stage, url, parent, time.time()) for url in urls],
+        )
+        self.conn.commit()
+
+    def complete(self, stage: str, url: str, result: Any, parent: Optional[str] = None):
+        """Mark a page done and store what was extracted from it"""
+        self.conn.execute(
+            """
+            INSERT INTO frontier (stage, url, parent, status, result, error, updated_at)
+            VALUES (?, ?, ?, 'done', ?, NULL, ?)
+            ON CONFLICT(stage, url) DO UPDATE SET
+                parent = COALESCE(excluded.parent, frontier.parent),
+                status = 'done',
+                result = excluded.result,
+                error = NULL,
+                updated_at = excluded.updated_at
+            """,
+            (stage, url, parent, json.dumps(result, ensure_ascii=False), time.time()),
+        )
+        self.conn.commit()
+
+    def fail(self, stage: str, url: str, error: str):
+        """Mark a page failed; failed pages are retried on the next run"""
+        self.conn.execute(
+            """
+            INSERT INTO frontier (stage, url, status, error, updated_at) VALUES (?, ?, 'failed', ?, ?)
+            ON CONFLICT(stage, url) DO UPDATE SET
+                status = 'failed',
+                error = excluded.error,
+                updated_at = excluded.updated_at
+            """,
+            (stage, url, error, time.time()),
+        )
+        self.conn.commit()
+
+    def result(self, stage: str, url: str) -> Optional[Any]:
+        """Stored result of a completed page, or None if it still has to be fetched"""
+        row = self.conn.execute(
+            "SELECT result FROM frontier WHERE stage = ? AND url = ? AND status = 'done'", (stage, url)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def pending(self, stage: str) -> List[str]:
+        """URLs of a stage that are not done yet, in the order they were queued"""
+        rows = self.conn.execute(
+            "SELECT url FROM frontier WHERE stage = ? AND status != 'done' ORDER BY rowid", (stage,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def results(self, stage: str) -> Dict[str, Any]:
+        """{url: result} for every completed page of a stage, in the order they were queued"""
+        rows = self.conn.execute(
+            "SELECT url, result FROM frontier WHERE stage = ? AND status = 'done' ORDER BY rowid", (stage,)
+        ).fetchall()
+        return {url: json.loads(result) for url, result in rows}
+
+    def failures(self) -> int:
+        """Number of pages (any stage) whose last attempt failed"""
+        return self.conn.execute("SELECT COUNT(*) FROM frontier WHERE status = 'failed'").fetchone()[0]
+
+    def reset(self):
+        """Forget everything, so the next run starts a fresh crawl"""
+        self.conn.execute("DELETE FROM frontier")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
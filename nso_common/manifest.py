@@ -0,0 +1,55 @@
+import sqlite3
+import time
+from typing import Optional
+
+
+class DownloadManifest:
+    """Persistent record of downloaded files, used to skip unchanged URLs on reruns"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS downloads (
+                url TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER,
+                sha256 TEXT,
+                updated_at REAL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, url: str) -> Optional[dict]:
+        row = self.conn.execute("SELECT * FROM downloads WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def record(self, url: str, path: str, etag: Optional[str], last_modified: Optional[str], size: int, sha256: str):
+        self.conn.execute(
+            """
+            INSERT INTO downloads (url, path, etag, last_modified, size, sha256, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                path = excluded.path,
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                size = excluded.size,
+                sha256 = excluded.sha256,
+                updated_at = excluded.updated_at
+            """,
+            (url, path, etag, last_modified, size, sha256, time.time()),
+        )
+        self.conn.commit()
+
+    def owner(self, path: str, url: str) -> Optional[dict]:
+        """Entry of another URL already saved at path, if any"""
+        row = self.conn.execute("SELECT * FROM downloads WHERE path = ? AND url != ?", (path, url)).fetchone()
+        return dict(row) if row else None
+
+    def close(self):
+        self.conn.close()
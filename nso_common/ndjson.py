@@ -0,0 +1,80 @@
+import json
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+class NdjsonWriter:
+    """Append records to an NDJSON file as they are extracted, one flushed line each"""
+
+    def __init__(self, path: str, on_record: Optional[Callable[[dict], None]] = None):
+        self.path = path
+        self.count = 0
+        self.on_record = on_record  # called with every record after it hits the file
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+        if self.on_record:
+            self.on_record(record)
+
+    def write_many(self, records: Iterable[dict]):
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class OrderedNdjsonWriter(NdjsonWriter):
+    """NDJSON writer that keeps a fixed key order while keys finish in any order
+
+    Records for a key are held in a reorder buffer until every earlier key has
+    been written, so the buffer only ever holds the out-of-order window.
+    """
+
+    def __init__(self, path: str, keys: Iterable[str], on_record: Optional[Callable[[dict], None]] = None):
+        super().__init__(path, on_record)
+        self._order = list(dict.fromkeys(keys))
+        self._next = 0
+        self._buffer: Dict[str, List[dict]] = {}
+
+    def put(self, key: str, records: List[dict]):
+        """Hand over all records for key; writes every key that is now next in line"""
+        self._buffer[key] = records
+        while self._next < len(self._order) and self._order[self._next] in self._buffer:
+            self.write_many(self._buffer.pop(self._order[self._next]))
+            self._next += 1
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buffer)
+
+
+def read_ndjson(path: str) -> Iterator[dict]:
+    """Yield the records of an NDJSON file one at a time"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_json_array(records: Iterable[dict], path: str, indent: int = 4) -> int:
+    """Stream records into a JSON array file, formatted like json.dump(..., indent=indent)"""
+    count = 0
+    pad = " " * indent
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in records:
+            body = json.dumps(record, ensure_ascii=False, indent=indent)
+            f.write(("," if count else "") + "\n" + pad + body.replace("\n", "\n" + pad))
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
@@ -0,0 +1,163 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CrawlResult
+
+from nso_common.static_fetch import extract_html
+from nso_common.urls import canonicalize
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings (environment variables)
+CACHE_DIR = os.environ.get("NSO_CACHE_DIR", os.path.join(REPO_ROOT, ".page_cache"))
+# Off by default: a production run must see newly published pages. Set NSO_CACHE=1 while
+# developing schemas or rerunning a crawl, so pages already rendered are only re-extracted.
+CACHE_ENABLED = os.environ.get("NSO_CACHE", "0") == "1"
+CACHE_TTL_HOURS = float(os.environ.get("NSO_CACHE_TTL_HOURS", "6"))
+CACHE_MAX_MB = int(os.environ.get("NSO_CACHE_MAX_MB", "2048"))
+CACHE_OFFLINE = os.environ.get("NSO_CACHE_OFFLINE", "0") == "1"  # serve everything from cache, never hit the network
+
+# CrawlerRunConfig fields that change what the rendered HTML looks like (the schema does not)
+INTERACTION_FIELDS = ("js_code", "wait_for", "scan_full_page", "magic", "js_only")
+
+
+class PageCache:
+    """Compressed on-disk HTML cache with a TTL and size-bounded LRU eviction
+
+    Entries are keyed by canonical URL plus the page's JS/interaction config,
+    not the extraction schema, so re-extracting with a changed schema reuses
+    pages that were already rendered.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, ttl_hours: float = CACHE_TTL_HOURS, max_mb: int = CACHE_MAX_MB,
+                 offline: bool = CACHE_OFFLINE, enabled: bool = CACHE_ENABLED):
+        self.root = root
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = max_mb * 1024 * 1024
+        self.offline = offline
+        self.enabled = enabled or offline
+        self.hits = 0
+        self.misses = 0
+        if not self.enabled:
+            return
+        os.makedirs(root, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=30)  # shared by shard processes
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def variant(config: Optional[CrawlerRunConfig]) -> str:
+        """Fingerprint of the interaction settings a page was rendered with"""
+        if config is None:
+            return ""
+        settings = {field: getattr(config, field, None) for field in INTERACTION_FIELDS}
+        return json.dumps(settings, sort_keys=True, default=str)
+
+    def _key(self, url: str, variant: str) -> str:
+        return hashlib.sha256(f"{canonicalize(url)}\n{variant}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".html.gz")
+
+    def get(self, url: str, variant: str = "") -> Optional[str]:
+        """Cached HTML for a page, or None if missing or older than the TTL (TTL is ignored offline)"""
+        if not self.enabled:
+            return None
+        key = self._key(url, variant)
+        row = self.conn.execute("SELECT created_at FROM pages WHERE key = ?", (key,)).fetchone()
+        if not row or (not self.offline and time.time() - row[0] > self.ttl):
+            self.misses += 1
+            return None
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                html = f.read()
+        except OSError:
+            self.conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            self.conn.commit()
+            self.misses += 1
+            return None
+        self.conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        self.hits += 1
+        return html
+
+    def put(self, url: str, html: str, variant: str = ""):
+        if not self.enabled or not html:
+            return
+        key = self._key(url, variant)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = gzip.compress(html.encode("utf-8"))
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages (key, url, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, canonicalize(url), len(data), now, now),
+        )
+        self.conn.commit()
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used pages until the cache fits in max_bytes"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM pages ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self.conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            total -= size
+        self.conn.commit()
+
+    async def arun(
+        self,
+        crawler: AsyncWebCrawler,
+        url: str,
+        config: CrawlerRunConfig,
+        fetch: Optional[Callable[[str, CrawlerRunConfig], Awaitable[List[CrawlResult]]]] = None,
+    ) -> List[CrawlResult]:
+        """Drop-in for crawler.arun: cached pages are re-extracted from disk with the current schema
+
+        A hit never touches the browser: the cached HTML is already the rendered
+        page (after its JS ran), so only the extraction schema is applied to it.
+        fetch replaces crawler.arun for cache misses (e.g. a StaticFetcher fast path).
+        """
+        variant = self.variant(config)
+        html = self.get(url, variant)
+        if html is not None:
+            return [extract_html(url, html, config)]
+        if self.offline:
+            return [CrawlResult(url=url, html="", success=False, error_message="Page not in cache (offline mode)")]
+        if fetch is not None:
+            results = await fetch(url, config)
+        else:
+            results = await crawler.arun(url=url, config=config)
+        for result in results:
+            if result.success and result.html:
+                self.put(url, result.html, variant)
+        return results
+
+    def close(self):
+        if self.enabled:
+            self.conn.close()
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import shutil
+import tempfile
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CrawlResult
+
+from nso_common.crawl_engine import LevelCrawler
+from nso_common.downloader import DownloadPipeline
+from nso_common.page_cache import PageCache
+from nso_common.static_fetch import StaticFetcher
+
+# A site is a plain dict, so onboarding an NSO means writing a config, not a crawler:
+#   {
+#       "name": "ONS Algeria",                       # used in log lines
+#       "base_url": "https://www.ons.dz/",
+#       "start_step": "main",                        # step applied to start_urls
+#       "start_urls": [...],                         # defaults to [base_url]
+#       "steps": {...},                              # LevelCrawler steps; "wait_for", "magic",
+#                                                    # "js_code" and "page_timeout" shape the page load;
+#                                                    # "require" is a CSS selector a plain-HTTP page must
+#                                                    # contain (defaults to a CSS wait_for)
+#       "static_patterns": [r"^https?://..."],       # server-rendered pages, fetched over plain HTTP first
+#       "concurrency": 8,                            # pages in flight per level
+#       "browser_pages": 4,                          # of those, pages open in the browser at once
+#       "headless": False,
+#       "output": "ons_documents.json",              # every document link with the path that led to it
+#       "links_output": "ons_links.txt",             # optional: unique document URLs
+#       "download_folder": "file_downloads",         # optional: download documents while crawling
+#   }
+Site = Dict[str, Any]
+
+PAGE_LOAD_FIELDS = ("wait_for", "magic", "js_code", "page_timeout")
+
+
+def static_requirement(step) -> Optional[str]:
+    """CSS selector a page fetched without the browser must contain to be used for this step"""
+    if "require" in step:
+        return step["require"]
+    wait_for = step.get("wait_for")
+    if not wait_for or wait_for.startswith("js:"):
+        return None
+    return wait_for[len("css:"):] if wait_for.startswith("css:") else wait_for
+
+
+async def run_site(site: Site, crawler: Optional[AsyncWebCrawler] = None, cache: Optional[PageCache] = None) -> List[dict]:
+    """Crawl one site config breadth-first and save its documents
+
+    Pass crawler (and cache) to share one browser between several sites;
+    otherwise the site gets its own for the length of the run.
+    """
+    name = site.get("name", site["base_url"])
+    own_cache = cache is None
+    cache = cache or PageCache()  # with NSO_CACHE=1, rendered pages are cached on disk, so reruns only re-extract
+    # LevelCrawler asks again for pages a deeper level needs: with the cache off, a scratch one
+    # kept for this run only serves them from disk instead of the network
+    scratch = None if cache.enabled else PageCache(root=tempfile.mkdtemp(prefix="nso_pages_"),
+                                                    ttl_hours=float("inf"), offline=False, enabled=True)
+    pages = scratch or cache
+    static = StaticFetcher(site.get("static_patterns", []))
+    downloads = DownloadPipeline(site["download_folder"]) if site.get("download_folder") else None
+    browser_pages = asyncio.Semaphore(max(1, site.get("browser_pages", site.get("concurrency", 8))))
+
+    async def fetch(url, step):
+        """Load one page's HTML: from the page cache, over plain HTTP when possible, else the browser"""
+        config = CrawlerRunConfig(**{field: step[field] for field in PAGE_LOAD_FIELDS if field in step})
+        variant = pages.variant(config)
+        html = pages.get(url, variant)
+        if html is not None or pages.offline:
+            return html
+        if static.handles(url):
+            # Missing the step's required element means the page needs JS: render it in the browser
+            html = await static.fetch_html(url, require=static_requirement(step))
+        if html is None:
+            async with browser_pages:
+                results: List[CrawlResult] = await crawler.arun(url=url, config=config)
+            html = next((result.html for result in results if result.success), None)
+        if html is not None:
+            pages.put(url, html, variant)
+        return html
+
+    async def queue_downloads(documents):
+        for document in documents:
+            await downloads.put(document["url"])
+
+    print(f"\n=== {name} ===")
+    engine = LevelCrawler(site["steps"], fetch, concurrency=site.get("concurrency", 8),
+                          on_documents=queue_downloads if downloads else None)
+    try:
+        # Unwound in reverse: fetcher, then browser, then the download queue drains
+        async with AsyncExitStack() as stack:
+            if downloads:
+                await stack.enter_async_context(downloads)
+            if crawler is None:
+                crawler = await stack.enter_async_context(AsyncWebCrawler(config=BrowserConfig(headless=site.get("headless", False))))
+            await stack.enter_async_context(static)
+            documents = await engine.run(site.get("start_step", "main"), site.get("start_urls", [site["base_url"]]))
+    finally:
+        if own_cache:
+            print(f"Page cache: {pages.hits} hits, {pages.misses} misses")
+            cache.close()
+        if scratch:
+            scratch.close()
+            shutil.rmtree(scratch.root, ignore_errors=True)
+
+    with open(site["output"], "w", encoding="utf-8") as f:
+        json.dump(documents, f, ensure_ascii=False, indent=4)
+    print(f"\nSaved {len(documents)} document links to {site['output']}")
+    print(f"Fetched {engine.pages_fetched} unique pages ({len(engine.failed)} failed)")
+
+    if site.get("links_output"):
+        links = list(dict.fromkeys(document["url"] for document in documents))
+        with open(site["links_output"], "w", encoding="utf-8") as f:
+            f.write("\n".join(links))
+        print(f"Saved {len(links)} unique links to {site['links_output']}")
+
+    if downloads and downloads.failed:
+        print(f"⚠️ {len(downloads.failed)} downloads failed for {name}")
+    return documents
@@ -0,0 +1,92 @@
+import json
+import re
+from typing import Iterable, List, Optional
+
+import aiohttp
+from bs4 import BeautifulSoup
+from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CrawlResult
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+)
+
+
+def extract_html(url: str, html: str, config: CrawlerRunConfig) -> CrawlResult:
+    """Run config's extraction schema over HTML we already have, without the browser"""
+    extracted = None
+    if config.extraction_strategy is not None:
+        extracted = json.dumps(config.extraction_strategy.run(url, [html]), ensure_ascii=False)
+    return CrawlResult(url=url, html=html, success=True, extracted_content=extracted)
+
+
+class StaticFetcher:
+    """Fast path for server-rendered pages: plain HTTP GET + the same JSON CSS schema, no browser
+
+    URLs matching one of `patterns` (regexes), or calls made with static=True, are
+    fetched over a pooled aiohttp session and run through config.extraction_strategy.
+    If the request fails, or the schema finds nothing and fallback_on_empty is set,
+    the page goes to the browser as before. Pages where an empty result is normal
+    (e.g. the last page has no next link) pass require= instead: a CSS selector the
+    page must contain, so only a page missing that structure goes to the browser.
+    """
+
+    def __init__(
+        self,
+        patterns: Iterable[str] = (),
+        concurrency: int = 8,
+        timeout: int = 30,
+        fallback_on_empty: bool = True,
+    ):
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.fallback_on_empty = fallback_on_empty
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, ssl=False),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": USER_AGENT},
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+
+    def handles(self, url: str) -> bool:
+        return any(pattern.search(url) for pattern in self.patterns)
+
+    async def fetch_html(self, url: str, require: Optional[str] = None) -> Optional[str]:
+        """GET a page and return its HTML, or None if it isn't a successful HTML response
+        or lacks the require CSS selector (i.e. it needs the browser to render)"""
+        try:
+            async with self.session.get(url) as response:
+                if response.status != 200 or "html" not in response.headers.get("Content-Type", "html"):
+                    return None
+                html = await response.text(errors="replace")
+        except (aiohttp.ClientError, UnicodeDecodeError, TimeoutError):
+            return None
+        if require is not None and BeautifulSoup(html, "lxml").select_one(require) is None:
+            return None
+        return html
+
+    async def arun(
+        self,
+        crawler: AsyncWebCrawler,
+        url: str,
+        config: CrawlerRunConfig,
+        static: Optional[bool] = None,
+        require: Optional[str] = None,
+    ) -> List[CrawlResult]:
+        """Drop-in for crawler.arun that tries the static fast path first"""
+        use_static = self.handles(url) if static is None else static
+        if use_static and config.extraction_strategy is not None:
+            html = await self.fetch_html(url, require)
+            if html:
+                result = extract_html(url, html, config)
+                if require is not None or not self.fallback_on_empty or json.loads(result.extracted_content):
+                    return [result]
+        return await crawler.arun(url=url, config=config)
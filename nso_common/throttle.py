@@ -0,0 +1,65 @@
+import asyncio
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class HostThrottle:
+    """Space out requests to the same host by at least `delay` seconds"""
+
+    def __init__(self, delay: float = 1.0):
+        self.delay = delay
+        self._next_slot: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        """Sleep until this host's next request slot is free, then reserve it"""
+        if self.delay <= 0:
+            return
+        host = urlparse(url).netloc.lower()
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.delay
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class Bandwidth:
+    """Cap the combined transfer rate of everything sharing this object at `rate` bytes per second
+
+    With rate_file the cap can change while running: the file holds the current
+    rate in KB/s (0 = unlimited) and is re-read every RATE_FILE_INTERVAL seconds.
+    """
+
+    RATE_FILE_INTERVAL = 1.0
+
+    def __init__(self, rate: float, rate_file: Optional[str] = None):
+        self.rate = rate
+        self.rate_file = rate_file
+        self._checked = 0.0
+        self._next_free = 0.0
+        self._lock = asyncio.Lock()
+
+    def _reload_rate(self):
+        now = time.monotonic()
+        if not self.rate_file or now - self._checked < self.RATE_FILE_INTERVAL:
+            return
+        self._checked = now
+        try:
+            with open(self.rate_file, "r", encoding="utf-8") as f:
+                self.rate = float(f.read().strip() or 0) * 1024
+        except (OSError, ValueError):
+            pass  # keep the last rate while the file is being rewritten
+
+    async def consume(self, nbytes: int):
+        """Account for nbytes just transferred, sleeping until they fit within the rate"""
+        self._reload_rate()
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            done = max(now, self._next_free) + nbytes / self.rate
+            self._next_free = done
+        if done > now:
+            await asyncio.sleep(done - now)
@@ -0,0 +1,76 @@
+import json
+import re
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+from nso_common.urls import canonicalize
+
+RULE_KINDS = ("prefix", "glob", "regex")
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate a path glob: ** spans slashes, * and ? stay within one segment"""
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out) + r"\Z"
+
+
+class UrlRules:
+    """Ordered URL routing table compiled into one regex; the first matching rule wins
+
+    Each rule is {"action": ..., "prefix" | "glob" | "regex": pattern} and is
+    matched against the path (and query) of the canonical URL, so
+    {"action": "skip", "glob": "/news-and-events/**"} covers the listing page
+    and every /page/N/ under it.
+    """
+
+    def __init__(self, rules: List[Dict[str, str]], default: str = "normal"):
+        self.default = default
+        self.actions: List[str] = []
+        alternatives = []
+        for index, rule in enumerate(rules):
+            kinds = [kind for kind in RULE_KINDS if kind in rule]
+            if len(kinds) != 1 or "action" not in rule:
+                raise ValueError(f"URL rule {index} needs an action and one of {RULE_KINDS}: {rule}")
+            pattern = rule[kinds[0]]
+            if kinds[0] == "prefix":
+                pattern = re.escape(pattern)
+            elif kinds[0] == "glob":
+                pattern = glob_to_regex(pattern)
+            alternatives.append(f"(?P<r{index}>{pattern})")
+            self.actions.append(rule["action"])
+        self._matcher = re.compile("|".join(alternatives)) if alternatives else None
+
+    @classmethod
+    def load(cls, path: str) -> "UrlRules":
+        """Read {"default": ..., "rules": [...]} from a JSON file"""
+        with open(path, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        return cls(table.get("rules", []), table.get("default", "normal"))
+
+    def action(self, url: str) -> str:
+        """Action of the first rule matching url, or the table's default"""
+        if self._matcher is None:
+            return self.default
+        parts = urlsplit(canonicalize(url))
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        match = self._matcher.match(target)
+        if not match:
+            return self.default
+        for name, value in match.groupdict().items():
+            if value is not None and name.startswith("r") and name[1:].isdigit():
+                return self.actions[int(name[1:])]
+        return self.default
@@ -0,0 +1,34 @@
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+
+
+def canonicalize(url: str, base_url: str = "") -> str:
+    """Absolute, normalised form of a link, used as the identity of a page
+
+    Relative links are resolved against base_url (the page they were found on)
+    with urljoin. Scheme and host are lowercased, default ports, fragments and
+    tracking parameters are dropped, and the remaining query parameters are
+    sorted, so the same page always maps to the same string.
+    """
+    url = urljoin(base_url, url.strip()) if base_url else url.strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = host if parts.port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{parts.port}"
+    path = parts.path or "/"
+    # Params are kept verbatim (SPIP uses valueless ones like ?article123), only filtered and sorted
+    params = [p for p in parts.query.split("&") if p and not p.lower().startswith(TRACKING_PARAMS)]
+    return urlunsplit((scheme, netloc, path, "&".join(sorted(params)), ""))
+
+
+def ensure_base_url(url: str, base_url: str) -> str:
+    """Make a site-relative link ("/x", "./x" or "x") absolute by prefixing base_url (which ends in '/')"""
+    if url.startswith(("http://", "https://")):
+        return url
+    if url.startswith("./"):
+        url = url[2:]
+    elif url.startswith("/"):
+        url = url[1:]
+    return base_url + url
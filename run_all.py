@@ -0,0 +1,271 @@
+"""Run several country NSO scrapers at once, sharing global budgets, and summarise the run
+
+Each country runs as its own process in its own folder (the scrapers write their
+outputs to the working directory, so two of them can't share one), concurrently
+since they crawl different hosts. Per-domain politeness stays inside each scraper.
+
+Browser pages are slots in a shared budget: a country takes a fair share of the
+free slots when it starts (through the environment variables that size its
+browser pages) and returns them when it exits, so a country that doesn't fit
+waits for one that finishes. Download bandwidth is rebalanced as countries
+start and finish: each scraper re-reads its share from NSO_DOWNLOAD_KBPS_FILE.
+
+    python run_all.py                          # every country
+    python run_all.py kenya namibia --pages 8 --download-kbps 4096
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Global budgets (overridable on the command line)
+BROWSER_PAGES = int(os.environ.get("NSO_BROWSER_PAGES", "12"))  # browser pages open at once, all countries together
+DOWNLOAD_KBPS = float(os.environ.get("NSO_TOTAL_DOWNLOAD_KBPS", "0"))  # download rate, all countries together (0 = unlimited)
+POLITENESS_DELAY = os.environ.get("NSO_POLITENESS_DELAY")  # seconds between page requests to one host, if set
+SUMMARY_PATH = os.path.join(REPO_ROOT, "run_summary.json")
+OUTPUT_LINE_LIMIT = 4 * 1024 * 1024  # some scrapers print whole JSON documents on one line
+
+# script: run from cwd; page_env: variables that cap the scraper's open browser pages;
+# max_pages: more pages than this don't help it; politeness_env: its per-host delay;
+# output: JSON array of records; failed: failed download list
+COUNTRIES = {
+    "kenya": {
+        "script": "Kenya/kenya_final.py",
+        "cwd": "Kenya",
+        "page_env": ["KNBS_REPORT_CONCURRENCY", "KNBS_PAGINATION_CONCURRENCY"],
+        "politeness_env": "KNBS_POLITENESS_DELAY",
+        "output": "knbs_files.json",
+        "failed": "failed_downloads.txt",
+    },
+    "namibia": {
+        "script": "Namibia/namibia.py",
+        "cwd": "Namibia",
+        "page_env": ["NSA_BROWSER_PAGES"],
+        "max_pages": 4,  # one page per section
+        "output": "nsa_data.json",
+        "failed": "failed_downloads.txt",
+    },
+    "algeria": {
+        "script": "Algeria script.py",
+        "cwd": ".",
+        "page_env": ["ONS_BROWSER_PAGES"],
+        "max_pages": 8,  # ONS_CONCURRENCY: pages in flight per level
+        "output": "ons_documents.json",
+    },
+}
+
+
+class PageBudget:
+    """Browser-page slots shared by the countries; taken when a country starts, returned when it exits"""
+
+    def __init__(self, total, countries):
+        self.total = max(1, total)
+        self.free = self.total
+        self.waiting = countries  # countries that haven't started yet
+        self._changed = asyncio.Condition()
+
+    async def acquire(self, max_pages=None):
+        """Wait for a free slot, then take a fair share of the free slots (the rest is left for those still waiting)"""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.free > 0)
+            pages = max(1, self.free // self.waiting)
+            if max_pages:
+                pages = min(pages, max_pages)
+            self.free -= pages
+            self.waiting -= 1
+            return pages
+
+    async def release(self, pages):
+        async with self._changed:
+            self.free += pages
+            self._changed.notify_all()
+
+
+class BandwidthShares:
+    """Splits the global download rate evenly between the running countries, through one rate file each"""
+
+    def __init__(self, total_kbps):
+        self.total_kbps = total_kbps
+        self.folder = tempfile.mkdtemp(prefix="nso_kbps_")
+        self.running = set()
+
+    def path(self, name):
+        return os.path.join(self.folder, f"{name}.kbps")
+
+    def start(self, name):
+        self.running.add(name)
+        self._rebalance()
+
+    def stop(self, name):
+        self.running.discard(name)
+        self._rebalance()
+
+    def _rebalance(self):
+        if self.total_kbps <= 0 or not self.running:
+            return
+        share = self.total_kbps / len(self.running)
+        for name in self.running:
+            temp_path = self.path(name) + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(str(share))
+            os.replace(temp_path, self.path(name))  # scrapers never read a half-written rate
+
+
+def country_env(name, pages, bandwidth):
+    """Environment for one country's process: its share of the global budgets"""
+    country = COUNTRIES[name]
+    env = dict(os.environ)
+    for variable in country["page_env"]:
+        env[variable] = str(pages)
+    if bandwidth.total_kbps > 0:
+        env["NSO_DOWNLOAD_KBPS_FILE"] = bandwidth.path(name)
+    if POLITENESS_DELAY and country.get("politeness_env"):
+        env[country["politeness_env"]] = POLITENESS_DELAY
+    env["PYTHONUNBUFFERED"] = "1"  # stream the scraper's log lines as they happen
+    env["PYTHONIOENCODING"] = "utf-8"  # the scrapers print emoji
+    return env
+
+
+def count_records(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return len(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def count_lines(path, since):
+    """Lines of a file written during this run (0 if it's older or missing)"""
+    if not os.path.exists(path) or os.path.getmtime(path) < since:
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+
+async def run_country(name, budget, bandwidth, children):
+    """Run one scraper to completion, prefixing its output, and return its summary"""
+    country = COUNTRIES[name]
+    cwd = os.path.join(REPO_ROOT, country["cwd"])
+    pages = await budget.acquire(country.get("max_pages"))
+    started = time.time()
+    tail = []
+    returncode = None
+    error = None
+    process = None
+    bandwidth.start(name)
+    try:
+        print(f"[{name}] → starting ({pages} browser pages, {bandwidth.total_kbps or 'unlimited'} KB/s shared downloads)")
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(REPO_ROOT, country["script"]),
+            cwd=cwd, env=country_env(name, pages, bandwidth),
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            limit=OUTPUT_LINE_LIMIT,
+        )
+        children.append(process)
+        skipping = False
+        while True:
+            try:
+                line = await process.stdout.readline()
+            except ValueError:  # longer than OUTPUT_LINE_LIMIT: the reader drops what it has buffered
+                if not skipping:
+                    print(f"[{name}] (line over {OUTPUT_LINE_LIMIT} bytes skipped)")
+                skipping = True
+                continue
+            if not line:
+                break
+            if skipping:  # the rest of the long line
+                skipping = False
+                continue
+            text = line.decode("utf-8", errors="replace").rstrip()
+            print(f"[{name}] {text}")
+            tail = (tail + [text])[-20:]
+        returncode = await process.wait()
+    except Exception as e:  # this country's failure must not take the others down
+        error = f"{type(e).__name__}: {e}"
+        print(f"[{name}] ❌ {error}")
+        if process is not None and process.returncode is None:
+            process.kill()  # unsupervised from here on, so stop it
+            returncode = await process.wait()
+    finally:
+        bandwidth.stop(name)
+        await budget.release(pages)
+
+    summary = {
+        "country": name,
+        "status": "ok" if returncode == 0 else "failed",
+        "returncode": returncode,
+        "seconds": round(time.time() - started, 1),
+        "browser_pages": pages,
+        "records": count_records(os.path.join(cwd, country["output"])),
+        "output": os.path.join(country["cwd"], country["output"]),
+    }
+    if country.get("failed"):
+        summary["failed_downloads"] = count_lines(os.path.join(cwd, country["failed"]), started)
+    if error:
+        summary["error"] = error
+    if returncode != 0:
+        summary["log_tail"] = tail
+    return summary
+
+
+def kill_children(children):
+    for process in children:
+        if process.returncode is None:
+            process.kill()
+
+
+async def run_all(names, browser_pages=BROWSER_PAGES, download_kbps=DOWNLOAD_KBPS):
+    """Run the given countries concurrently and write run_summary.json"""
+    budget = PageBudget(browser_pages, len(names))
+    bandwidth = BandwidthShares(download_kbps)
+    children = []
+    started = datetime.now()
+    try:
+        summaries = await asyncio.gather(*(run_country(name, budget, bandwidth, children) for name in names))
+    except BaseException:
+        kill_children(children)  # interrupted: don't leave scrapers running unsupervised
+        raise
+    finally:
+        shutil.rmtree(bandwidth.folder, ignore_errors=True)
+
+    run = {
+        "started": started.isoformat(timespec="seconds"),
+        "seconds": round((datetime.now() - started).total_seconds(), 1),
+        "browser_pages": browser_pages,
+        "download_kbps": download_kbps,
+        "countries": summaries,
+    }
+    with open(SUMMARY_PATH, "w", encoding="utf-8") as f:
+        json.dump(run, f, ensure_ascii=False, indent=4)
+
+    print("\n=== Run summary ===")
+    for summary in summaries:
+        icon = "✅" if summary["status"] == "ok" else "❌"
+        failed = f", {summary['failed_downloads']} failed downloads" if summary.get("failed_downloads") else ""
+        print(f"{icon} {summary['country']}: {summary['records']} records in {summary['seconds']}s{failed}")
+    print(f"Total: {run['seconds']}s → {SUMMARY_PATH}")
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("countries", nargs="*", help=f"any of {', '.join(COUNTRIES)} (default: all)")
+    parser.add_argument("--pages", type=int, default=BROWSER_PAGES, help="browser pages open at once, all countries together")
+    parser.add_argument("--download-kbps", type=float, default=DOWNLOAD_KBPS, help="download rate, all countries together")
+    args = parser.parse_args()
+    unknown = [name for name in args.countries if name not in COUNTRIES]
+    if unknown:
+        parser.error(f"unknown countries: {', '.join(unknown)}")
+    run = asyncio.run(run_all(args.countries or list(COUNTRIES), args.pages, args.download_kbps))
+    sys.exit(0 if all(summary["status"] == "ok" for summary in run["countries"]) else 1)
+
+
+if __name__ == "__main__":
+    main()